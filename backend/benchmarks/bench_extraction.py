@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark listing field extraction on the saved listing HTML in fixtures/.
+
+Compares the original per-field extractors (copied verbatim below: one
+get_text() and one regex search per field, as parse_property_from_url used
+to do) against the extraction engine, which materialises the text once.
+The engine's extract_* wrappers can't serve as the baseline: each of them
+already runs on the engine.
+
+Usage: python benchmarks/bench_extraction.py [--repeat N]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from typing import Optional, Tuple
+
+from bs4 import BeautifulSoup
+from services.property_parser import engine, extract_property_type, extract_location
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+def load_fixtures():
+    """Return [(name, url, soup)] for every saved listing"""
+    urls = json.loads((FIXTURES_DIR / "listings.json").read_text(encoding="utf-8"))
+    fixtures = []
+    for name, url in urls.items():
+        html = (FIXTURES_DIR / name).read_text(encoding="utf-8")
+        fixtures.append((name, url, BeautifulSoup(html, "html.parser")))
+    return fixtures
+
+# --- Original extractors, verbatim (price and sizes have since learned
+# more formats, so those fields are timed but not compared) ---
+
+def extract_price(soup: BeautifulSoup) -> Optional[float]:
+    """Extract price in USD"""
+    # Look for price elements
+    price_selectors = [
+        {'class': 'price'},
+        {'class': 'property-price'},
+        {'class': 'price-sale'},
+    ]
+    
+    for selector in price_selectors:
+        price_elem = soup.find(attrs=selector)
+        if price_elem:
+            price_text = price_elem.get_text()
+            # Extract numbers
+            numbers = re.findall(r'[\d,]+', price_text.replace('$', '').replace(',', ''))
+            if numbers:
+                try:
+                    return float(numbers[0])
+                except:
+                    pass
+    
+    return None
+
+def extract_bedrooms(soup: BeautifulSoup) -> Optional[int]:
+    """Extract number of bedrooms"""
+    # Look for bedroom info
+    text = soup.get_text()
+    match = re.search(r'(\d+)\s*bed', text.lower())
+    if match:
+        return int(match.group(1))
+    return None
+
+def extract_bathrooms(soup: BeautifulSoup) -> Optional[int]:
+    """Extract number of bathrooms"""
+    text = soup.get_text()
+    match = re.search(r'(\d+)\s*bath', text.lower())
+    if match:
+        return int(match.group(1))
+    return None
+
+def extract_sizes(soup: BeautifulSoup) -> Tuple[Optional[float], Optional[float]]:
+    """Extract floor area and land size"""
+    size_sqm = None
+    land_size_sqm = None
+    
+    text = soup.get_text()
+    
+    # Look for floor area
+    match = re.search(r'floor area[:\s]+(\d+)\s*m', text.lower())
+    if match:
+        size_sqm = float(match.group(1))
+    
+    # Look for land size
+    match = re.search(r'land size[:\s]+(\d+)\s*m', text.lower())
+    if match:
+        land_size_sqm = float(match.group(1))
+    
+    return size_sqm, land_size_sqm
+
+def extract_ownership_type(soup: BeautifulSoup) -> Optional[str]:
+    """Extract ownership type (hard title, soft title, etc.)"""
+    text = soup.get_text().lower()
+    
+    if 'hard title' in text:
+        return 'hard_title'
+    if 'soft title' in text:
+        return 'soft_title'
+    if 'strata title' in text:
+        return 'strata_title'
+    
+    return None
+
+def extract_floor_level(soup: BeautifulSoup, property_type: str) -> Optional[int]:
+    """Extract floor level (for condos)"""
+    if property_type != 'condo':
+        return None
+    
+    text = soup.get_text()
+    match = re.search(r'floor[:\s]+(\d+)', text.lower())
+    if match:
+        return int(match.group(1))
+    
+    return None
+
+def extract_per_field(soup, url) -> dict:
+    """One full-document pass per field"""
+    property_type = extract_property_type(soup, url)
+    size_sqm, land_size_sqm = extract_sizes(soup)
+    return {
+        "type": property_type,
+        "price_usd": extract_price(soup),
+        "bedrooms": extract_bedrooms(soup),
+        "bathrooms": extract_bathrooms(soup),
+        "size_sqm": size_sqm,
+        "land_size_sqm": land_size_sqm,
+        "ownership_type": extract_ownership_type(soup),
+        "floor_level": extract_floor_level(soup, property_type),
+        "location": extract_location(soup),
+    }
+
+# Fields whose parsing is unchanged since the original extractors
+COMPARED_FIELDS = ("type", "bedrooms", "bathrooms", "ownership_type", "floor_level", "location")
+
+def time_it(func, fixtures, repeat: int) -> float:
+    """Mean milliseconds per listing"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, url, soup in fixtures:
+            func(soup, url)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(fixtures))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    print(f"📄 {len(fixtures)} fixture listings, {args.repeat} rounds")
+
+    # Both paths must agree before timing means anything
+    for name, url, soup in fixtures:
+        original = extract_per_field(soup, url)
+        fields = engine.extract(soup, url)
+        expected = {field: original[field] for field in COMPARED_FIELDS}
+        actual = {field: fields[field] for field in COMPARED_FIELDS}
+        if expected != actual:
+            print(f"❌ {name}: results differ\n   per-field: {expected}\n   engine:    {actual}")
+            sys.exit(1)
+    print(f"✅ Engine results identical to the original extractors ({', '.join(COMPARED_FIELDS)})")
+
+    per_field_ms = time_it(extract_per_field, fixtures, args.repeat)
+    engine_ms = time_it(engine.extract, fixtures, args.repeat)
+
+    print(f"\n   original extractors:  {per_field_ms:8.3f} ms/listing")
+    print(f"   extraction engine:    {engine_ms:8.3f} ms/listing")
+    print(f"   speedup:              {per_field_ms / engine_ms:8.2f}x")
+
+if __name__ == "__main__":
+    main()
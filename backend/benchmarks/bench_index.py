@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency of the ANN index types against the exact flat baseline.
+
+Uses synthetic clustered unit vectors (embeddings of a legal corpus are
+clustered by topic, uniform random vectors would flatter every index).
+Reports build time, index size, recall@k and ms/query for each setting.
+
+Usage: python benchmarks/bench_index.py [--n 20000] [--dim 1536] [--queries 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import faiss
+import numpy as np
+from services.index_factory import create_index, prepare_vectors, set_search_params, min_training_points
+
+def clustered_vectors(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return prepare_vectors(vectors, "cosine")
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def timed_search(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=["l2", "cosine"], default="cosine")
+    parser.add_argument("--threads", type=int, default=1, help="faiss OpenMP threads")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(0)
+    data = clustered_vectors(args.n, args.dim, clusters=max(8, args.n // 200), rng=rng)
+    queries = data[rng.choice(args.n, args.queries, replace=False)] + 0.05 * rng.standard_normal(
+        (args.queries, args.dim)).astype(np.float32)
+    queries = prepare_vectors(queries, args.metric)
+
+    print(f"📊 {args.n} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}, metric={args.metric}\n")
+    print(f"   {'index':8s} {'setting':14s} {'build s':>8s} {'size MB':>8s} {'recall':>7s} {'ms/query':>9s}")
+
+    flat = create_index("flat", args.dim, args.metric)
+    start = time.perf_counter()
+    flat.add(data)
+    build = time.perf_counter() - start
+    truth, ms = timed_search(flat, queries, args.k)
+    size = len(faiss.serialize_index(flat)) / 1e6
+    print(f"   {'flat':8s} {'exact':14s} {build:8.2f} {size:8.1f} {1.0:7.3f} {ms:9.3f}")
+
+    configs = [
+        ("hnsw", {}, "efSearch", [16, 32, 64, 128, 256]),
+        ("ivfpq", {}, "nprobe", [1, 4, 8, 16, 32, 64]),
+    ]
+    for kind, options, knob, values in configs:
+        index = create_index(kind, args.dim, args.metric, n_vectors=args.n,
+                             pq_m=_pq_m(args.dim), **options)
+        needed = min_training_points(index)
+        if needed > args.n:
+            print(f"   {kind:8s} skipped: needs {needed} training vectors")
+            continue
+        start = time.perf_counter()
+        if not index.is_trained:
+            index.train(data)
+        index.add(data)
+        build = time.perf_counter() - start
+        size = len(faiss.serialize_index(index)) / 1e6
+        for value in values:
+            if knob == "efSearch":
+                set_search_params(index, ef_search=value)
+            else:
+                set_search_params(index, nprobe=value)
+            ids, ms = timed_search(index, queries, args.k)
+            print(f"   {kind:8s} {f'{knob}={value}':14s} {build:8.2f} {size:8.1f} "
+                  f"{recall_at_k(ids, truth):7.3f} {ms:9.3f}")
+
+def _pq_m(dim: int) -> int:
+    """Largest sub-quantizer count up to 64 that divides dim"""
+    return next(m for m in (64, 48, 32, 24, 16, 8, 4, 2, 1) if dim % m == 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the hot functions outside the request path's I/O.
+
+- chunk_text over the knowledge files, repeated (index builds)
+- each extract_* function and the extraction engine on the fixtures/ HTML
+- VectorStore.search_by_vector on a flat index of --chunks synthetic
+  chunks, unfiltered and restricted to one source
+
+Best of --repeat rounds each, so runs are comparable between commits.
+
+Usage: python benchmarks/bench_micro.py [--repeat 5] [--chunks 20000] [--queries 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from services.embeddings import FakeEmbeddingProvider
+from services.knowledge_base import load_knowledge_base
+from services.property_parser import (
+    engine,
+    extract_property_type,
+    extract_price,
+    extract_bedrooms,
+    extract_bathrooms,
+    extract_sizes,
+    extract_ownership_type,
+    extract_floor_level,
+    extract_location,
+)
+from services.vector_store import VectorStore, chunk_text
+from bench_extraction import load_fixtures
+
+EXTRACTORS = {
+    "extract_property_type": lambda soup, url: extract_property_type(soup, url),
+    "extract_price": lambda soup, url: extract_price(soup),
+    "extract_bedrooms": lambda soup, url: extract_bedrooms(soup),
+    "extract_bathrooms": lambda soup, url: extract_bathrooms(soup),
+    "extract_sizes": lambda soup, url: extract_sizes(soup),
+    "extract_ownership_type": lambda soup, url: extract_ownership_type(soup),
+    "extract_floor_level": lambda soup, url: extract_floor_level(soup, "condo"),
+    "extract_location": lambda soup, url: extract_location(soup),
+    "engine.extract (all fields)": lambda soup, url: engine.extract(soup, url),
+}
+
+def best_of(fn, repeat: int) -> float:
+    """Best wall-clock seconds of `repeat` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_chunk_text(repeat: int):
+    # The knowledge files are small, repeat them to a corpus worth timing
+    text = "\n\n".join(load_knowledge_base().values()) * 100
+    words = len(text.split())
+    seconds = best_of(lambda: chunk_text(text), repeat)
+    print(f"   chunk_text            {words} words -> {len(chunk_text(text))} chunks "
+          f"{seconds * 1000:8.2f} ms  ({words / seconds / 1e6:.1f}M words/s)")
+
+def bench_extractors(repeat: int):
+    fixtures = load_fixtures()
+    for name, extract in EXTRACTORS.items():
+        seconds = best_of(lambda: [extract(soup, url) for _, url, soup in fixtures], repeat)
+        print(f"   {name:28s} {seconds * 1e6 / len(fixtures):9.0f} µs/listing")
+
+def synthetic_store(n_chunks: int, rng) -> VectorStore:
+    knowledge = load_knowledge_base()
+    provider = FakeEmbeddingProvider()
+    texts, metadata = [], []
+    for source, text in knowledge.items():
+        for chunk in chunk_text(text, chunk_size=60, overlap=10):
+            texts.append(chunk)
+            metadata.append({"source": source})
+    # Repeat the real chunks with a few random words swapped in, up to n_chunks
+    vocabulary = " ".join(texts).split()
+    while len(texts) < n_chunks:
+        i = int(rng.integers(len(metadata)))
+        words = texts[i].split()
+        for j in rng.integers(len(words), size=5):
+            words[j] = vocabulary[int(rng.integers(len(vocabulary)))]
+        texts.append(" ".join(words))
+        metadata.append(metadata[i])
+
+    store = VectorStore(dimension=provider.dimension, index_type="flat")
+    store.add_embeddings(np.array(provider.embed_sync(texts)), texts, metadata)
+    return store
+
+def bench_search(n_chunks: int, n_queries: int, repeat: int, rng):
+    store = synthetic_store(n_chunks, rng)
+    provider = FakeEmbeddingProvider()
+    queries = provider.embed_sync([
+        "can a foreigner own a condo on the ground floor",
+        "long term lease for a villa with land",
+        "transfer tax and stamp duty costs",
+        "company structure with a cambodian partner",
+    ] * (n_queries // 4 or 1))
+    one_source = store.sources[:1]
+
+    for label, sources in (("all sources", None), (f"source={one_source[0]}", one_source)):
+        seconds = best_of(lambda: [store.search_by_vector(q, k=5, sources=sources) for q in queries], repeat)
+        print(f"   search_by_vector {label:24s} {seconds * 1000 / len(queries):8.3f} ms/query "
+              f"({store.index.ntotal} chunks)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"📊 best of {args.repeat}\n")
+    bench_chunk_text(args.repeat)
+    print()
+    bench_extractors(args.repeat)
+    print()
+    bench_search(args.chunks, args.queries, args.repeat, rng)
+
+if __name__ == "__main__":
+    main()
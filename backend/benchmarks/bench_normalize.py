@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for services/normalize.py.
+
+- price strings: the old strip-and-findall chain from extract_price vs
+  parse_price per string vs normalize_prices on the whole column
+- area strings: parse_area per string vs normalize_areas on the column
+
+Columns are synthetic but shaped like scraped data: a few thousand distinct
+values repeated across many listings, mostly plain "$123,000" prices.
+
+Usage: python benchmarks/bench_normalize.py [--rows 200000] [--distinct 2000] [--repeat 3]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from services.normalize import normalize_areas, normalize_prices, parse_area, parse_price
+
+PRICE_FORMATS = [
+    "${:,}", "${:,}", "${:,}", "USD {:,}", "{:,} USD",
+    "${k}K", "US$ {m:.1f}M", "{khr:,} KHR", "${:,} - ${hi:,}",
+]
+AREA_FORMATS = ["{} m²", "{} sqm", "{:,} sqft", "{ha:.2f} ha", "{} square meters"]
+
+def price_strings(distinct: int, rng) -> list:
+    values = []
+    for _ in range(distinct):
+        usd = int(rng.integers(20, 3000)) * 1000
+        fmt = PRICE_FORMATS[rng.integers(len(PRICE_FORMATS))]
+        values.append(fmt.format(usd, k=usd // 1000, m=usd / 1e6, khr=usd * 4100, hi=usd + 20000))
+    return values
+
+def area_strings(distinct: int, rng) -> list:
+    values = []
+    for _ in range(distinct):
+        sqm = int(rng.integers(30, 5000))
+        fmt = AREA_FORMATS[rng.integers(len(AREA_FORMATS))]
+        values.append(fmt.format(sqm if "sqft" not in fmt else int(sqm * 10.764), ha=sqm / 10000))
+    return values
+
+def legacy_price(text: str):
+    """extract_price before normalize.py: first run of digits, $ and , stripped"""
+    numbers = re.findall(r'[\d,]+', text.replace('$', '').replace(',', ''))
+    if numbers:
+        try:
+            return float(numbers[0])
+        except ValueError:
+            pass
+    return None
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    prices = np.array(price_strings(args.distinct, rng))[rng.integers(args.distinct, size=args.rows)]
+    areas = np.array(area_strings(args.distinct, rng))[rng.integers(args.distinct, size=args.rows)]
+    price_list, area_list = prices.tolist(), areas.tolist()
+
+    print(f"📊 {args.rows} rows, {args.distinct} distinct strings, best of {args.repeat}\n")
+    cases = [
+        ("price  legacy chain / string", lambda: [legacy_price(v) for v in price_list]),
+        ("price  parse_price / string", lambda: [parse_price(v) for v in price_list]),
+        ("price  normalize_prices column", lambda: normalize_prices(prices)),
+        ("area   parse_area / string", lambda: [parse_area(v) for v in area_list]),
+        ("area   normalize_areas column", lambda: normalize_areas(areas)),
+    ]
+    for name, fn in cases:
+        seconds = timed(fn, args.repeat)
+        print(f"   {name:32s} {seconds * 1000:9.1f} ms  {seconds / args.rows * 1e9:8.0f} ns/row")
+
+    # Same answers either way
+    column = normalize_prices(prices[:2000])
+    scalar = np.array([parse_price(v) for v in price_list[:2000]], dtype=np.float64)
+    assert np.allclose(column, scalar, equal_nan=True)
+    wrong = sum(legacy_price(v) != parse_price(v) for v in price_list[:2000])
+    print(f"\n   legacy chain disagrees with parse_price on {wrong / 20:.1f}% of rows (K/M, KHR, ranges)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare HTML parser backends on the saved listing HTML in fixtures/.
+
+Every backend must produce exactly the same PropertyData as the reference
+"html.parser" backend; then each is timed end to end (parse + extract).
+
+Usage: python benchmarks/bench_parsers.py [--repeat N]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.html_backend import BACKENDS
+from services.property_parser import parse_listing_html
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+REFERENCE = "html.parser"
+
+def load_fixtures():
+    """Return [(name, url, html)] for every saved listing"""
+    urls = json.loads((FIXTURES_DIR / "listings.json").read_text(encoding="utf-8"))
+    return [
+        (name, url, (FIXTURES_DIR / name).read_text(encoding="utf-8"))
+        for name, url in urls.items()
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    print(f"📄 {len(fixtures)} fixture listings, {args.repeat} rounds")
+
+    failed = False
+    for name, url, html in fixtures:
+        expected = parse_listing_html(html, url, backend=REFERENCE)
+        for backend in BACKENDS:
+            actual = parse_listing_html(html, url, backend=backend)
+            if actual != expected:
+                failed = True
+                print(f"❌ {name} [{backend}]\n   expected: {expected}\n   actual:   {actual}")
+    if failed:
+        sys.exit(1)
+    print(f"✅ All backends match {REFERENCE}\n")
+
+    baseline_ms = None
+    for backend in [REFERENCE] + [b for b in BACKENDS if b != REFERENCE]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, url, html in fixtures:
+                parse_listing_html(html, url, backend=backend)
+        ms = (time.perf_counter() - start) * 1000 / (args.repeat * len(fixtures))
+        baseline_ms = baseline_ms or ms
+        print(f"   {backend:12s} {ms:8.3f} ms/listing  ({baseline_ms / ms:5.2f}x)")
+
+if __name__ == "__main__":
+    main()
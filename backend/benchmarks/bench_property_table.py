@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Memory and throughput of PropertyTable vs a list of PropertyData.
+
+Builds N synthetic listings (types, floors and locations in realistic
+proportions) and reports bytes per listing for both representations, the
+cost of converting between them, and compute_eligibility per object vs
+vectorised over the table.
+
+Usage: python benchmarks/bench_property_table.py [--n 50000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from models.property import PropertyData
+from models.property_table import PropertyTable
+
+TYPES = ["condo", "condo", "condo", "villa", "house", "land", "unknown"]
+OWNERSHIP = [None, "hard_title", "soft_title", "strata_title"]
+
+def make_listings(n: int, rng) -> list:
+    locations = [f"Location {i}" for i in range(300)]
+    listings = []
+    for i in range(n):
+        kind = TYPES[rng.integers(len(TYPES))]
+        listings.append(PropertyData(
+            id=str(200000 + i),
+            url=f"https://www.realestate.com.kh/buy/area/{kind}-{200000 + i}/",
+            type=kind,
+            price_usd=float(rng.integers(30, 3000) * 1000),
+            bedrooms=int(rng.integers(0, 6)),
+            bathrooms=int(rng.integers(1, 5)),
+            size_sqm=float(rng.integers(30, 600)),
+            land_size_sqm=float(rng.integers(100, 2000)) if kind in ("villa", "house", "land") else None,
+            ownership_type=OWNERSHIP[rng.integers(len(OWNERSHIP))],
+            floor_level=int(rng.integers(0, 30)) if kind == "condo" else None,
+            location=locations[rng.integers(len(locations))],
+        ))
+    return listings
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=50000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    tracemalloc.start()
+    listings = make_listings(args.n, rng)
+    records_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    table, build = timed(lambda: PropertyTable.from_records(listings))
+    print(f"📊 {args.n} listings\n")
+    print(f"   memory   list[PropertyData] {records_bytes / args.n:8.0f} B/listing")
+    print(f"   memory   PropertyTable      {table.nbytes() / args.n:8.0f} B/listing "
+          f"({records_bytes / table.nbytes():.1f}x smaller)\n")
+
+    records, convert_back = timed(table.to_records)
+    print(f"   convert  from_records       {args.n / build:10.0f} listings/s")
+    print(f"   convert  to_records         {args.n / convert_back:10.0f} listings/s")
+    assert [r.dict() for r in records[:1000]] == [r.dict() for r in listings[:1000]]
+
+    _, per_object = timed(lambda: [listing.compute_eligibility() for listing in records])
+    _, vectorised = timed(table.compute_eligibility)
+    print(f"\n   eligibility per object      {per_object * 1000:8.1f} ms")
+    print(f"   eligibility vectorised      {vectorised * 1000:8.1f} ms ({per_object / vectorised:.0f}x faster)")
+
+    # Same answers either way
+    assert [r.dict() for r in table.to_records()[:2000]] == [r.dict() for r in records[:2000]]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI API, for load tests without API credits.
+
+Serves /v1/chat/completions (plain JSON or an SSE stream) and
+/v1/embeddings in the shapes the openai client expects. Chat answers wait
+--latency-ms before the first token, then produce --answer-tokens tokens
+at --tokens-per-second; embeddings wait --embedding-latency-ms and return
+deterministic hashed word vectors, so similar texts stay close.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage: python benchmarks/fake_openai.py [--port 8100] [--latency-ms 300]
+       [--tokens-per-second 60] [--answer-tokens 150] [--embedding-latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "Foreigners can own condominium units above the ground floor under strata title, "
+    "while land and landed houses need a long-term lease or a Cambodian majority company"
+).split()
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+app = FastAPI(title="Fake OpenAI")
+config = {
+    "latency_ms": 300.0,
+    "tokens_per_second": 60.0,
+    "answer_tokens": 150,
+    "embedding_latency_ms": 20.0,
+    "dimension": 1536,
+}
+
+
+def answer_tokens():
+    return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(config["answer_tokens"])]
+
+
+def embedding(text: str) -> list:
+    vector = np.zeros(config["dimension"], dtype=np.float32)
+    for token in _TOKEN.findall(text.lower()):
+        bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[bucket % config["dimension"]] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def prompt_tokens(messages: list) -> int:
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "gpt-4o-mini")
+    created = int(time.time())
+    tokens = answer_tokens()
+    delay = 1.0 / config["tokens_per_second"] if config["tokens_per_second"] > 0 else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(config["latency_ms"] / 1000 + delay * len(tokens))
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens(body.get("messages", [])),
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens(body.get("messages", [])) + len(tokens),
+            },
+        })
+
+    def chunk(delta: dict, finish_reason=None) -> bytes:
+        payload = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+    async def stream():
+        await asyncio.sleep(config["latency_ms"] / 1000)
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(delay)
+        yield chunk({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    await asyncio.sleep(config["embedding_latency_ms"] / 1000)
+    return JSONResponse({
+        "object": "list",
+        "data": [{"object": "embedding", "index": i, "embedding": embedding(text)} for i, text in enumerate(texts)],
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": sum(len(t) for t in texts) // 4, "total_tokens": sum(len(t) for t in texts) // 4},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"])
+    parser.add_argument("--tokens-per-second", type=float, default=config["tokens_per_second"])
+    parser.add_argument("--answer-tokens", type=int, default=config["answer_tokens"])
+    parser.add_argument("--embedding-latency-ms", type=float, default=config["embedding_latency_ms"])
+    args = parser.parse_args()
+    config.update(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        embedding_latency_ms=args.embedding_latency_ms,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
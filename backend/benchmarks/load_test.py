@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Load test /api/ask and /api/ask/stream against local stand-ins.
+
+Boots three local servers: a fixture site that serves the saved listing
+HTML in fixtures/ under --listings distinct listing URLs, the fake OpenAI
+API in fake_openai.py (chat, streaming and embeddings with the given
+latency and token rate), and the app itself under uvicorn pointed at both,
+with its caches and stores in a fresh temporary STATE_DIR. Then drives
+--concurrency clients through --requests requests per endpoint and
+reports p50/p95/p99 latency, time to first answer frame (stream) and
+requests/s, followed by the app's own stage timings from /metrics.
+
+No API credits are used and realestate.com.kh is never contacted.
+
+Usage: python benchmarks/load_test.py [--endpoint stream|ask|both] [--concurrency 16]
+       [--requests 200] [--listings 50] [--latency-ms 300] [--tokens-per-second 60]
+       [--answer-tokens 150] [--answer-cache]
+"""
+
+import argparse
+import asyncio
+import http.server
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+ENDPOINTS = {"ask": "/api/ask", "stream": "/api/ask/stream"}
+QUESTIONS = [
+    "Can I own this property as a foreigner?",
+    "What ownership structure do you recommend?",
+    "How does a long-term lease work here?",
+    "What taxes and fees should I expect?",
+    "Is a Cambodian company structure safe?",
+]
+_STAGE_LINE = re.compile(r'^explainer_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fixture_site() -> http.server.ThreadingHTTPServer:
+    """/listing/<n>/ serves fixture number n (modulo the fixture count)"""
+    pages = [path.read_bytes() for path in sorted(FIXTURES_DIR.glob("*.html"))]
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            match = re.match(r"^/listing/(\d+)/?$", self.path)
+            if match is None:
+                self.send_error(404)
+                return
+            body = pages[int(match.group(1)) % len(pages)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_fake_openai(args) -> tuple:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, str(Path(__file__).parent / "fake_openai.py"),
+        "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--answer-tokens", str(args.answer_tokens),
+        "--embedding-latency-ms", str(args.embedding_latency_ms),
+    ])
+    wait_until_up(f"http://127.0.0.1:{port}/docs", process)
+    return process, f"http://127.0.0.1:{port}/v1"
+
+
+def start_app(openai_url: str, state_dir: str, args) -> tuple:
+    port = free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-load-test",
+        OPENAI_BASE_URL=openai_url,
+        EMBEDDING_PROVIDER="openai",
+        STATE_DIR=state_dir,
+        ANSWER_CACHE_ENABLED=str(args.answer_cache).lower(),
+        HTML_ARCHIVE_ENABLED="false",
+        PREFETCH_ENABLED="false",
+        METRICS_ENABLED="true",
+    )
+    log = open(Path(state_dir) / "app.log", "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()  # the child keeps its own handle
+    wait_until_up(f"http://127.0.0.1:{port}/health", process)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def ask(client: httpx.AsyncClient, path: str, payload: dict) -> tuple:
+    """(latency, time to first answer frame or None)"""
+    start = time.perf_counter()
+    if path == ENDPOINTS["ask"]:
+        response = await client.post(path, json=payload)
+        response.raise_for_status()
+        return time.perf_counter() - start, None
+
+    first_answer = None
+    async with client.stream("POST", path, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_answer is None and line.startswith('data: {"type": "answer"'):
+                first_answer = time.perf_counter() - start
+    return time.perf_counter() - start, first_answer
+
+
+async def run_load(app_url: str, site_url: str, path: str, args) -> dict:
+    latencies, ttfts, errors = [], [], []
+    counter = iter(range(args.requests))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=app_url, timeout=120.0, limits=limits) as client:
+        async def worker():
+            for i in counter:
+                payload = {
+                    "property_url": f"{site_url}/listing/{i % args.listings}/",
+                    "question": QUESTIONS[i % len(QUESTIONS)],
+                }
+                try:
+                    latency, ttft = await ask(client, path, payload)
+                except Exception as e:
+                    errors.append(str(e))
+                    continue
+                latencies.append(latency)
+                if ttft is not None:
+                    ttfts.append(ttft)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        metrics = (await client.get("/metrics")).text
+
+    return {"latencies": latencies, "ttfts": ttfts, "errors": errors, "elapsed": elapsed, "metrics": metrics}
+
+
+def percentiles(values: list) -> str:
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return f"p50 {p50:7.0f} ms   p95 {p95:7.0f} ms   p99 {p99:7.0f} ms"
+
+
+def stage_means(metrics: str) -> dict:
+    sums, counts = {}, {}
+    for line in metrics.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            (sums if kind == "sum" else counts)[stage] = float(value)
+    return {stage: (sums[stage] / counts[stage] * 1000, int(counts[stage])) for stage in sums if counts.get(stage)}
+
+
+def report(path: str, result: dict, args):
+    done = len(result["latencies"])
+    print(f"\n📊 {path}: {done}/{args.requests} ok, {len(result['errors'])} errors, "
+          f"concurrency {args.concurrency}, {args.listings} listings\n")
+    print(f"   latency   {percentiles(result['latencies'])}")
+    if result["ttfts"]:
+        print(f"   ttft      {percentiles(result['ttfts'])}")
+    print(f"   throughput {done / result['elapsed']:.1f} req/s over {result['elapsed']:.1f}s")
+    if result["errors"]:
+        print(f"   first error: {result['errors'][0]}")
+
+    stages = stage_means(result["metrics"])
+    if stages:
+        print("\n   server stages (mean, from /metrics)")
+        for stage, (mean_ms, count) in sorted(stages.items()):
+            print(f"   {stage:14s} {mean_ms:8.1f} ms  x{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoint", choices=["stream", "ask", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--listings", type=int, default=50, help="distinct listing URLs")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake OpenAI time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    args = parser.parse_args()
+
+    site = start_fixture_site()
+    site_url = f"http://127.0.0.1:{site.server_address[1]}"
+    fake_openai, openai_url = start_fake_openai(args)
+    print(f"🔨 Fixture site {site_url}, fake OpenAI {openai_url}")
+
+    endpoints = ["stream", "ask"] if args.endpoint == "both" else [args.endpoint]
+    try:
+        for name in endpoints:
+            # Fresh app and state per endpoint, so neither run warms the other's caches
+            with tempfile.TemporaryDirectory(prefix="load-test-") as state_dir:
+                app, app_url = start_app(openai_url, state_dir, args)
+                try:
+                    result = asyncio.run(run_load(app_url, site_url, ENDPOINTS[name], args))
+                finally:
+                    app.terminate()
+                    app.wait()
+                report(ENDPOINTS[name], result, args)
+    finally:
+        fake_openai.terminate()
+        fake_openai.wait()
+        site.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -2,58 +2,174 @@
 """
 Script to build FAISS index from knowledge base files.
 Run this once to create embeddings, then rerun when knowledge base is updated.
+
+Rebuilds are incremental: chunk embeddings are cached by content hash, so only
+new or edited chunks are sent to the embeddings API, and every finished batch
+is saved straight away, so an interrupted build resumes where it stopped.
+
+Usage:
+    python build_index.py                # incremental build with OpenAI
+    python build_index.py --force        # rebuild even if nothing changed
+    python build_index.py --fake         # offline build with fake embeddings
+    python build_index.py --migrate      # convert a legacy pickle index in place
 """
 
+import argparse
+import asyncio
+import hashlib
+import pickle
 import sys
 from pathlib import Path
 
+import faiss
+
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from services.vector_store import VectorStore, chunk_text
-from services.knowledge_base import load_knowledge_base
+from services.knowledge_base import load_knowledge_base, CHUNK_SIZE, CHUNK_OVERLAP
+from services.embeddings import create_provider, embed_documents
+from services import index_store
+from services.index_factory import INDEX_TYPES, METRICS
 
-def build_index():
+# Model the legacy pickle indexes were built with
+LEGACY_EMBEDDING_MODEL = "text-embedding-3-small"
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def build_index(name: str = "knowledge_base", provider_name: str = None, batch_size: int = 64,
+                concurrency: int = 4, force: bool = False, index_type: str = None, metric: str = None):
     """Build FAISS index from knowledge base"""
     print("🔨 Building FAISS index from knowledge base...")
-    
+
+    embedder = create_provider(provider_name)
+
     # Load knowledge base
     knowledge = load_knowledge_base()
-    
+
     # Create vector store
-    vector_store = VectorStore()
-    
+    vector_store = VectorStore(index_type=index_type, metric=metric)
+    previous = index_store.read_manifest(vector_store.index_path, name) or {}
+
+    source_hashes = {source: content_hash(content) for source, content in knowledge.items()}
+    if (not force
+            and previous.get("embedding_model") == embedder.model
+            and previous.get("index_kind", "flat") == vector_store.index_type
+            and previous.get("metric", "l2") == vector_store.metric
+            and previous.get("sources") == source_hashes):
+        print(f"✅ Index '{name}' is up to date (use --force to rebuild)")
+        return
+
     # Process each knowledge file
     all_texts = []
     all_metadata = []
-    
+
     for source, content in knowledge.items():
-        print(f"📄 Processing {source}...")
-        
+        changed = previous.get("sources", {}).get(source) != source_hashes[source]
+        print(f"📄 Processing {source}{' (changed)' if changed else ''}...")
+
         # Split into chunks
-        chunks = chunk_text(content, chunk_size=400, overlap=50)
-        
+        chunks = chunk_text(content, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+
         # Add metadata
         metadata = [{"source": source, "chunk_id": i} for i in range(len(chunks))]
-        
+
         all_texts.extend(chunks)
         all_metadata.extend(metadata)
-        
+
         print(f"   Created {len(chunks)} chunks")
-    
+
     # Add to index
-    print(f"\n🔄 Creating embeddings for {len(all_texts)} chunks...")
-    print("   (This will take a minute, using OpenAI API...)")
-    
-    vector_store.add_texts(all_texts, all_metadata)
-    
+    print(f"\n🔄 Creating embeddings for {len(all_texts)} chunks with {embedder.model}...")
+    print(f"   (unchanged chunks are reused, {batch_size} per request, {concurrency} in flight)")
+
+    def report(done: int, total: int):
+        print(f"   Embedded {done}/{total} new chunks")
+
+    embeddings = asyncio.run(embed_documents(
+        all_texts,
+        embedder=embedder,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        on_batch=report,
+    ))
+    vector_store.add_embeddings(embeddings, all_texts, all_metadata)
+
     # Save index
     print("\n💾 Saving index to disk...")
-    vector_store.save()
-    
+    vector_store.save(name, embedding_model=embedder.model, extra={"sources": source_hashes})
+
     print(f"\n✅ Done! Index contains {len(all_texts)} text chunks")
     print(f"   Index saved to: backend/data/faiss_index/")
     print("\n🚀 You can now start the backend server")
 
+def load_legacy_index(vector_store: VectorStore, name: str = "knowledge_base") -> bool:
+    """
+    Load an index saved in the old pickle format. Only the migration reads
+    pickle files; the server refuses them (unpickling runs arbitrary code).
+    """
+    if not vector_store.has_legacy_index(name):
+        return False
+    
+    index_file, texts_file, metadata_file = vector_store.legacy_files(name)
+    vector_store.index = faiss.read_index(str(index_file))
+    
+    with open(texts_file, 'rb') as f:
+        vector_store.texts = pickle.load(f)
+    
+    with open(metadata_file, 'rb') as f:
+        vector_store.metadata = pickle.load(f)
+    
+    return True
+
+def migrate_index(name: str = "knowledge_base"):
+    """Rewrite a legacy pickle index in the current format without re-embedding"""
+    vector_store = VectorStore()
+    if not load_legacy_index(vector_store, name):
+        print(f"❌ No legacy index '{name}' found")
+        return
+
+    # Record source hashes only if the index still matches the knowledge files
+    knowledge = load_knowledge_base()
+    current_chunks = [
+        chunk for content in knowledge.values()
+        for chunk in chunk_text(content, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    ]
+    extra = None
+    if current_chunks == list(vector_store.texts):
+        extra = {"sources": {source: content_hash(content) for source, content in knowledge.items()}}
+
+    vector_store.save(name, embedding_model=LEGACY_EMBEDDING_MODEL, extra=extra)
+    for suffix in ("_texts.pkl", "_metadata.pkl"):
+        (vector_store.index_path / f"{name}{suffix}").unlink()
+    print(f"✅ Migrated '{name}' ({vector_store.index.ntotal} chunks), pickle files removed")
+
 if __name__ == "__main__":
-    build_index()
+    parser = argparse.ArgumentParser(description="Build the knowledge base FAISS index")
+    parser.add_argument("--name", default=None, help="index name (default: knowledge_base)")
+    parser.add_argument("--fake", action="store_true", help="use offline fake embeddings")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embeddings request")
+    parser.add_argument("--concurrency", type=int, default=4, help="embeddings requests in flight")
+    parser.add_argument("--force", action="store_true", help="rebuild even if nothing changed")
+    parser.add_argument("--migrate", action="store_true", help="convert a legacy pickle index")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None, help="default: settings.INDEX_TYPE")
+    parser.add_argument("--metric", choices=METRICS, default=None, help="default: settings.INDEX_METRIC")
+    args = parser.parse_args()
+
+    # Fake embeddings don't match the query model, keep them out of the served index
+    name = args.name or ("knowledge_base_fake" if args.fake else "knowledge_base")
+
+    if args.migrate:
+        migrate_index(name)
+        sys.exit(0)
+
+    build_index(
+        name=name,
+        provider_name="fake" if args.fake else None,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        force=args.force,
+        index_type=args.index_type,
+        metric=args.metric,
+    )
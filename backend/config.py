@@ -3,7 +3,116 @@ from pathlib import Path
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: str = ""  # e.g. a local stand-in for load tests, empty = api.openai.com
     MODEL: str = "gpt-4o-mini"
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_PROVIDER: str = "openai"  # "fake" for offline hashing embeddings
+    INDEX_VERIFY_CHECKSUMS: bool = False  # hash index files against the manifest on load
+    
+    # Vector index (used when building; search tuning also applies on load)
+    INDEX_TYPE: str = "flat"  # "flat", "hnsw" or "ivfpq"
+    INDEX_METRIC: str = "l2"  # "l2" or "cosine" (inner product on normalised vectors)
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    IVF_NLIST: int = 0  # 0 = about 4 * sqrt(number of chunks)
+    IVF_NPROBE: int = 8
+    IVF_PQ_M: int = 64  # sub-quantizers, must divide the dimension
+    IVF_PQ_NBITS: int = 8
+    EMBEDDING_CACHE_SIZE: int = 2048  # in-memory query embeddings (disk cache is unbounded)
+    
+    # Listing cache
+    PROPERTY_CACHE_SIZE: int = 512
+    PROPERTY_CACHE_TTL: float = 600.0  # seconds a listing is served without refetching
+    PROPERTY_CACHE_STALE_TTL: float = 3600.0  # extra seconds served stale while refreshing
+    
+    # Persistent listing store and background prefetch
+    PROPERTY_STORE_TTL: float = 600.0  # seconds before a stored listing is revalidated (ETag / Last-Modified)
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_SITEMAP_URL: str = ""
+    PREFETCH_URLS_FILE: str = ""  # one listing URL per line
+    PREFETCH_URL_PATTERN: str = r"-\d+/?$"  # sitemap entries that are listing pages
+    PREFETCH_INTERVAL: float = 3600.0  # seconds between sitemap / URL file crawls
+    PREFETCH_CONCURRENCY: int = 4
+    PREFETCH_MAX_URLS: int = 500  # per /api/prefetch request
+    PREFETCH_MAX_QUEUE: int = 10000  # URLs waiting; the overflow is dropped
+    
+    # Semantic answer cache for /api/ask
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1000
+    ANSWER_CACHE_TTL: float = 86400.0
+    ANSWER_CACHE_THRESHOLD: float = 0.92  # min cosine similarity between questions
+    
+    # Knowledge packed into each prompt
+    CONTEXT_TOKEN_BUDGET: int = 1200
+    CONTEXT_CANDIDATES: int = 5  # chunks retrieved before packing
+    
+    # Knowledge retrieval: BM25 over the index chunks next to FAISS
+    HYBRID_RETRIEVAL: bool = True  # fuse BM25 and vector rankings (reciprocal rank fusion)
+    RRF_K: int = 60  # rank offset in the fusion, higher flattens the rank weights
+    LEXICAL_FAST_PATH: bool = True  # answer lexical questions from BM25 without an embeddings call
+    LEXICAL_MIN_COVERAGE: float = 0.75  # share of question content words the chunks must contain
+    
+    # /api/ask/batch
+    BATCH_MAX_URLS: int = 100
+    BATCH_MAX_QUESTIONS: int = 5
+    BATCH_CONCURRENCY: int = 8  # listing fetches and OpenAI calls in flight per batch
+    
+    # OpenAI call scheduling (see services/model_scheduler.py)
+    MODEL_MAX_IN_FLIGHT: int = 16  # chat completions in flight; the rest queue
+    MODEL_MAX_QUEUE: int = 200  # waiting calls beyond this are shed at once
+    MODEL_QUEUE_TIMEOUT: float = 10.0  # max seconds waiting for a slot / rate limit
+    MODEL_DEADLINE: float = 60.0  # per call: no queueing or retry that would end past this
+    OPENAI_RPM: int = 0  # account requests/minute quota, 0 = unlimited
+    OPENAI_TPM: int = 0  # account tokens/minute quota, 0 = unlimited
+    MODEL_MAX_RETRIES: int = 3  # on rate limits, timeouts, connection errors and 5xx
+    MODEL_RETRY_BASE: float = 0.5  # full-jitter backoff: up to base * 2^attempt seconds
+    MODEL_RETRY_MAX: float = 8.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failures that open the circuit
+    CIRCUIT_RESET_TIMEOUT: float = 30.0  # seconds open before a trial call
+    FALLBACK_CACHE_THRESHOLD: float = 0.8  # answer cache similarity accepted when the model is down
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # Prometheus text format at /metrics
+    SERVER_TIMING_ENABLED: bool = False  # per-request stage durations in a Server-Timing header
+    
+    # Frontend static files
+    STATIC_MEMORY_MAX_FILE: int = 1_000_000  # larger files are streamed from disk
+    
+    # Server-sent events for /api/ask/stream
+    STREAM_COALESCE_MS: float = 50.0  # merge deltas arriving within this window, 0 = frame per delta
+    STREAM_MAX_FRAME_BYTES: int = 1024  # flush a frame early once it reaches this size
+    STREAM_QUEUE_SIZE: int = 64  # deltas buffered ahead of a slow client
+    
+    # Shared HTTP client for listing fetches
+    HTTP_HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_MAX_PER_HOST: int = 10
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 20.0
+    HTTP_WRITE_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+    
+    # Raw listing HTML kept for offline re-parsing
+    HTML_ARCHIVE_ENABLED: bool = True
+    HTML_ARCHIVE_CODEC: str = "gzip"  # "gzip" or "br" (needs brotli)
+    
+    # Price normalisation
+    KHR_PER_USD: float = 4100.0
+    
+    # Listing HTML parsing: "fast" (lxml + targeted soup), "lxml" or "html.parser"
+    HTML_PARSER: str = "fast"
+    PARSE_WORKERS: int = 4
+    
+    # Caches and stores written at runtime (embedding cache, listing store,
+    # HTML archive, reparse runs); empty = backend/data. The FAISS index stays in backend/data.
+    STATE_DIR: str = ""
+    
+    @property
+    def state_dir(self) -> Path:
+        return Path(self.STATE_DIR) if self.STATE_DIR else Path(__file__).parent / "data"
     
     class Config:
         env_file = str(Path(__file__).parent.parent / ".env")
@@ -1,15 +1,29 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse, HTMLResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from pathlib import Path
-import asyncio
-import json
+from typing import List, Optional
 
-from services.property_parser import parse_property_from_url
-from services.knowledge_base import get_relevant_knowledge
-from services.openai_service import call_openai, stream_openai_response
+from services.property_cache import property_cache
+from services.property_store import property_store
+from services.prefetch import prefetch_worker
+from services.html_archive import html_archive
+from services.static_assets import static_assets
+from services.metrics import metrics, watch_cache, TimingMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.pipeline import prepare_answer
+from services.knowledge_base import get_lexical_index
+from services.openai_service import call_openai, stream_openai_response, SYSTEM_PROMPT, QUESTION_PROMPT
+from services.model_scheduler import model_scheduler, ModelUnavailable
+from services.fallback import fallback_answer, FallbackStream
+from services.prompts import prompts
+from services.context_packer import packer_stats
+from services.batch import BatchRun
+from services.http_client import start_http_client, close_http_client
+from services.embeddings import embedding_cache
+from services.answer_cache import answer_cache, store_answer, replay_answer
+from services.sse import coalesce, answer_frame, event_frame, StreamStats, DONE_FRAME
+from config import settings
 
 app = FastAPI(
     title="Cambodia Property Explainer API",
@@ -17,9 +31,6 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# Get paths
-BASE_DIR = Path(__file__).parent.parent
-
 # CORS middleware to allow frontend calls
 app.add_middleware(
     CORSMiddleware,
@@ -29,36 +40,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing for /metrics and the optional Server-Timing header
+app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+watch_cache("property", property_cache.stats)
+watch_cache("property_store", property_store.stats)
+watch_cache("embedding", embedding_cache.stats)
+watch_cache("answer", answer_cache.stats)
+
+@app.on_event("startup")
+async def startup():
+    """Open the shared pooled HTTP client, load prompt templates and indexes, start prefetching"""
+    await start_http_client()
+    prompts.load(SYSTEM_PROMPT, QUESTION_PROMPT)
+    static_assets.load()
+    # FAISS index + BM25 over its chunks, off the loop: every question is
+    # checked against BM25 before the pipeline's stages start
+    await asyncio.to_thread(get_lexical_index)
+    await asyncio.to_thread(property_store.count)
+    if settings.PREFETCH_ENABLED:
+        prefetch_worker.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop prefetching and close pooled connections"""
+    await prefetch_worker.stop()
+    await close_http_client()
+
 class QuestionRequest(BaseModel):
     """Request model for asking a question"""
     property_url: str
     question: str
 
+class BatchRequest(BaseModel):
+    """Request model for analysing many listings at once"""
+    property_urls: List[str]
+    questions: List[str]
+
+class PrefetchRequest(BaseModel):
+    """Request model for queueing listings to prefetch"""
+    property_urls: List[str]
+
 class QuestionResponse(BaseModel):
     """Response model for answers"""
     answer: str
     property: dict
     
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve the main HTML page"""
-    html_path = BASE_DIR / "index.html"
-    return FileResponse(html_path, media_type="text/html")
+    return serve_static("/", request)
 
 @app.get("/css/{file_path:path}")
-async def serve_css(file_path: str):
+async def serve_css(file_path: str, request: Request):
     """Serve CSS files"""
-    return FileResponse(BASE_DIR / "css" / file_path, media_type="text/css")
+    return serve_static(f"/css/{file_path}", request)
 
 @app.get("/js/{file_path:path}")
-async def serve_js(file_path: str):
+async def serve_js(file_path: str, request: Request):
     """Serve JavaScript files"""
-    return FileResponse(BASE_DIR / "js" / file_path, media_type="application/javascript")
+    return serve_static(f"/js/{file_path}", request)
 
 @app.get("/data/{file_path:path}")
-async def serve_data(file_path: str):
+async def serve_data(file_path: str, request: Request):
     """Serve data files"""
-    return FileResponse(BASE_DIR / "data" / file_path, media_type="application/javascript")
+    return serve_static(f"/data/{file_path}", request)
+
+def serve_static(url: str, request: Request):
+    """In-memory, precompressed asset with ETag / Cache-Control (see services/static_assets.py)"""
+    return static_assets.response(
+        url,
+        if_none_match=request.headers.get("if-none-match"),
+        accept_encoding=request.headers.get("accept-encoding", ""),
+    )
 
 @app.post("/api/ask/stream")
 async def ask_question_stream(request: QuestionRequest):
@@ -66,26 +119,52 @@ async def ask_question_stream(request: QuestionRequest):
     Streaming endpoint: Answer a question with streaming response
     """
     try:
-        # Parse property data
+        # Fetch listing, embed question and load prompt/index concurrently
         print(f"Parsing property from: {request.property_url}")
-        property_data = await parse_property_from_url(request.property_url)
-        
-        # Get relevant knowledge
-        print(f"Loading knowledge base for {property_data.type}")
-        knowledge = get_relevant_knowledge(property_data, request.question)
+        prepared = await prepare_answer(request.property_url, request.question)
+        property_data = prepared.property_data
         
         # Stream response
         async def generate():
             # Send property data first
-            yield f"data: {json.dumps({'type': 'property', 'data': property_data.dict()})}\n\n"
+            yield event_frame("property", property_data.dict())
+            
+            # Stream answer (replayed from the answer cache when possible)
+            if prepared.cached_answer is not None:
+                deltas = replay_answer(prepared.cached_answer)
+            else:
+                # Falls back to a cached or rule-based answer when the model is unavailable
+                deltas = FallbackStream(
+                    stream_openai_response(
+                        property_data, prepared.knowledge, request.question, prepared.system_prompt
+                    ),
+                    property_data,
+                    request.question,
+                    prepared.question_embedding,
+                )
             
-            # Stream answer
-            async for chunk in stream_openai_response(property_data, knowledge, request.question):
-                yield f"data: {json.dumps({'type': 'answer', 'data': chunk})}\n\n"
-                await asyncio.sleep(0.01)  # Small delay for smooth streaming
+            # Deltas are merged into frames; a client disconnect cancels this
+            # generator, which cancels the upstream OpenAI stream
+            stats = StreamStats()
+            parts = []
+            async for chunk in coalesce(
+                deltas,
+                window_ms=settings.STREAM_COALESCE_MS,
+                max_bytes=settings.STREAM_MAX_FRAME_BYTES,
+                queue_size=settings.STREAM_QUEUE_SIZE,
+                stats=stats,
+            ):
+                parts.append(chunk)
+                frame = answer_frame(chunk)
+                stats.record_frame(frame)
+                yield frame
+            
+            print(f"⏱️  Streamed answer for {property_data.id}: {stats.summary()}")
+            if prepared.cached_answer is None and not deltas.fallback:
+                store_answer(property_data, request.question, await prepared.answer_embedding(), "".join(parts))
             
             # Send done signal
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield DONE_FRAME
         
         return StreamingResponse(generate(), media_type="text/event-stream")
         
@@ -102,23 +181,30 @@ async def ask_question(request: QuestionRequest):
     Main endpoint: Answer a question about a specific property
     
     Steps:
-    1. Parse property data from URL
-    2. Load relevant knowledge base
+    1. Parse property data, embed the question and load the prompt (concurrently)
+    2. Load relevant knowledge base (skipped on an answer cache hit)
     3. Generate answer using OpenAI
     4. Return answer + property data
     """
     try:
-        # Step 1: Parse property data
+        # Steps 1-2: Prepare property data, knowledge and prompt
         print(f"Parsing property from: {request.property_url}")
-        property_data = await parse_property_from_url(request.property_url)
-        
-        # Step 2: Get relevant knowledge
-        print(f"Loading knowledge base for {property_data.type}")
-        knowledge = get_relevant_knowledge(property_data, request.question)
+        prepared = await prepare_answer(request.property_url, request.question)
+        property_data = prepared.property_data
         
-        # Step 3: Generate answer
-        print(f"Generating answer for question: {request.question}")
-        answer = await call_openai(property_data, knowledge, request.question)
+        # Properties with the same eligibility profile share answers
+        answer = prepared.cached_answer
+        if answer is None:
+            # Step 3: Generate answer
+            print(f"Generating answer for question: {request.question}")
+            try:
+                answer = await call_openai(
+                    property_data, prepared.knowledge, request.question, prepared.system_prompt
+                )
+                store_answer(property_data, request.question, await prepared.answer_embedding(), answer)
+            except ModelUnavailable as e:
+                print(f"⚠️  Model unavailable, answering from fallback: {e}")
+                answer = fallback_answer(property_data, request.question, prepared.question_embedding)
         
         # Step 4: Return response
         return QuestionResponse(
@@ -133,6 +219,59 @@ async def ask_question(request: QuestionRequest):
             detail=f"Error processing request: {str(e)}"
         )
 
+@app.post("/api/ask/batch")
+async def ask_batch(request: BatchRequest):
+    """
+    Batch endpoint: Answer questions about many properties, streamed as NDJSON
+    
+    One line per parsed property and per answer as they complete, then a
+    summary line. Properties with the same eligibility profile share
+    retrieval and generation.
+    """
+    if not request.property_urls or not request.questions:
+        raise HTTPException(status_code=422, detail="property_urls and questions must not be empty")
+    if len(request.property_urls) > settings.BATCH_MAX_URLS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BATCH_MAX_URLS} property URLs per batch")
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions per batch")
+    
+    print(f"Batch of {len(request.property_urls)} properties, {len(request.questions)} questions")
+    batch = BatchRun(request.property_urls, request.questions, concurrency=settings.BATCH_CONCURRENCY)
+    return StreamingResponse(batch.stream(), media_type="application/x-ndjson")
+
+@app.post("/api/prefetch")
+async def prefetch(request: PrefetchRequest):
+    """Queue listings for the background prefetch worker"""
+    if not prefetch_worker.running:
+        raise HTTPException(status_code=503, detail="Prefetch worker is not running (PREFETCH_ENABLED)")
+    if len(request.property_urls) > settings.PREFETCH_MAX_URLS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.PREFETCH_MAX_URLS} property URLs per request")
+    dropped = prefetch_worker.dropped
+    queued = prefetch_worker.enqueue(request.property_urls)
+    return {"queued": queued, "dropped": prefetch_worker.dropped - dropped}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Listing cache hit/miss counters"""
+    return {
+        "property_cache": property_cache.stats(),
+        "property_store": property_store.stats(),
+        "prefetch": prefetch_worker.stats(),
+        "html_archive": html_archive.stats(),
+        "static_assets": static_assets.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "context_packer": packer_stats.stats(),
+        "model_scheduler": model_scheduler.stats(),
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latencies, token counts and cache hit ratios in Prometheus format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED)")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
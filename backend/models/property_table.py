@@ -0,0 +1,180 @@
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from models.property import PropertyData
+
+# Missing value for the integer columns
+INT_NA = np.iinfo(np.int32).min
+
+LEASEHOLD_STRUCTURES = ("leasehold", "company_structure")
+STRATA_STRUCTURES = ("strata_title",)
+
+
+class Categories:
+    """
+    Dictionary encoding for a low-cardinality column: each row stores a
+    small integer code, every distinct value is kept once. Code 0 is None.
+    """
+
+    def __init__(self, values: Sequence = ()):
+        self.values: List = [None]
+        self._codes: Dict = {None: 0}
+        for value in values:
+            self.code(value)
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value) -> Optional[int]:
+        """Code of a value already seen, without adding it"""
+        return self._codes.get(value)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        values = np.empty(len(self.values), dtype=object)
+        for code, value in enumerate(self.values):
+            values[code] = value
+        return values[codes]
+
+    def encode(self, values: Iterable, dtype=np.uint16) -> np.ndarray:
+        return np.fromiter((self.code(value) for value in values), dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _optional_ints(values: Iterable[Optional[int]]) -> np.ndarray:
+    return np.fromiter((INT_NA if v is None else v for v in values), dtype=np.int32)
+
+
+def _optional_floats(values: Iterable[Optional[float]]) -> np.ndarray:
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64)
+
+
+class PropertyTable:
+    """
+    Column-oriented (struct of arrays) collection of parsed listings.
+
+    One NumPy array per PropertyData field instead of one pydantic object per
+    listing: numbers are float64 with NaN or int32 with INT_NA for missing
+    values, low-cardinality strings (type, ownership, location, recommended
+    structures) are dictionary encoded, id and url stay Python strings.
+    Converts to and from PropertyData without loss.
+
+    Only benchmarks/bench_property_table.py uses it so far: BatchRun and
+    PrefetchWorker handle listings one at a time as they are fetched, so
+    they keep PropertyData.
+    """
+
+    INT_FIELDS = ("bedrooms", "bathrooms", "floor_level")
+    FLOAT_FIELDS = ("price_usd", "size_sqm", "land_size_sqm")
+    CATEGORY_FIELDS = ("type", "ownership_type", "location")
+
+    def __init__(self, size: int = 0):
+        self.id = np.empty(size, dtype=object)
+        self.url = np.empty(size, dtype=object)
+        for name in self.INT_FIELDS:
+            setattr(self, name, np.full(size, INT_NA, dtype=np.int32))
+        for name in self.FLOAT_FIELDS:
+            setattr(self, name, np.full(size, np.nan))
+        self.categories: Dict[str, Categories] = {
+            name: Categories() for name in (*self.CATEGORY_FIELDS, "recommended_structures")
+        }
+        self.type_code = np.zeros(size, dtype=np.uint16)
+        self.ownership_type_code = np.zeros(size, dtype=np.uint16)
+        self.location_code = np.zeros(size, dtype=np.uint32)
+        self.recommended_structures_code = np.zeros(size, dtype=np.uint16)
+        self.has_land = np.zeros(size, dtype=bool)
+        self.is_foreign_eligible_direct = np.zeros(size, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def from_records(cls, records: Sequence[PropertyData]) -> "PropertyTable":
+        table = cls(0)
+        table.id = np.array([r.id for r in records] or [], dtype=object)
+        table.url = np.array([r.url for r in records] or [], dtype=object)
+        for name in cls.INT_FIELDS:
+            setattr(table, name, _optional_ints(getattr(r, name) for r in records))
+        for name in cls.FLOAT_FIELDS:
+            setattr(table, name, _optional_floats(getattr(r, name) for r in records))
+        for name in cls.CATEGORY_FIELDS:
+            dtype = getattr(table, f"{name}_code").dtype
+            codes = table.categories[name].encode((getattr(r, name) for r in records), dtype)
+            setattr(table, f"{name}_code", codes)
+        table.recommended_structures_code = table.categories["recommended_structures"].encode(
+            tuple(r.recommended_structures) for r in records
+        )
+        table.has_land = np.fromiter((r.has_land for r in records), dtype=bool, count=len(records))
+        table.is_foreign_eligible_direct = np.fromiter(
+            (r.is_foreign_eligible_direct for r in records), dtype=bool, count=len(records)
+        )
+        return table
+
+    def column(self, name: str) -> np.ndarray:
+        """Decoded values of a dictionary-encoded column (object array)"""
+        return self.categories[name].decode(getattr(self, f"{name}_code"))
+
+    def record(self, i: int) -> PropertyData:
+        fields = {"id": self.id[i], "url": self.url[i]}
+        for name in self.INT_FIELDS:
+            value = int(getattr(self, name)[i])
+            fields[name] = None if value == INT_NA else value
+        for name in self.FLOAT_FIELDS:
+            value = float(getattr(self, name)[i])
+            fields[name] = None if np.isnan(value) else value
+        for name in self.CATEGORY_FIELDS:
+            fields[name] = self.categories[name].values[getattr(self, f"{name}_code")[i]]
+        structures = self.categories["recommended_structures"].values[self.recommended_structures_code[i]]
+        fields["recommended_structures"] = list(structures or ())
+        fields["has_land"] = bool(self.has_land[i])
+        fields["is_foreign_eligible_direct"] = bool(self.is_foreign_eligible_direct[i])
+        return PropertyData(**fields)
+
+    def to_records(self) -> List[PropertyData]:
+        return [self.record(i) for i in range(len(self))]
+
+    def __iter__(self) -> Iterator[PropertyData]:
+        return (self.record(i) for i in range(len(self)))
+
+    def _type_is(self, value: str) -> np.ndarray:
+        code = self.categories["type"].lookup(value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.type_code == code
+
+    def compute_eligibility(self) -> "PropertyTable":
+        """
+        PropertyData.compute_eligibility for every row at once.
+
+        Same rules and precedence; rows no rule applies to keep their values.
+        """
+        condo = self._type_is("condo")
+        floor = self.floor_level
+        has_floor = floor != INT_NA
+
+        strata = condo & has_floor & (floor >= 2)
+        leasehold = ~strata & (self._type_is("villa") | (condo & (floor == 1)) | self._type_is("land"))
+
+        self.is_foreign_eligible_direct[strata] = True
+        self.is_foreign_eligible_direct[leasehold] = False
+        self.has_land[leasehold] = True
+
+        structures = self.categories["recommended_structures"]
+        self.recommended_structures_code[strata] = structures.code(STRATA_STRUCTURES)
+        self.recommended_structures_code[leasehold] = structures.code(LEASEHOLD_STRUCTURES)
+        return self
+
+    def nbytes(self) -> int:
+        """Array memory plus the id/url strings and category values they point to"""
+        arrays = [value for value in vars(self).values() if isinstance(value, np.ndarray)]
+        total = sum(array.nbytes for array in arrays)
+        total += sum(sys.getsizeof(s) for s in self.id) + sum(sys.getsizeof(s) for s in self.url)
+        total += sum(sys.getsizeof(v) for c in self.categories.values() for v in c.values)
+        return total
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Script to re-parse saved listing HTML with the current extractors.
+Run it after changing property_parser.py to see what the change does to
+every page we have already fetched, without downloading anything.
+
+Pages are parsed across a process pool; prices and areas come back as raw
+strings and are normalised column by column (services/normalize.py), each
+distinct string once. Results are written as one compressed NumPy
+column file per run (reparse/run-<timestamp>.npz in the STATE_DIR state
+directory). Each run is compared with the previous one field by field.
+
+Usage:
+    python reparse.py                          # every listing in the HTML archive
+    python reparse.py --dir saved_pages/       # *.html / *.html.gz / *.html.br files
+    python reparse.py --workers 8 --show 5     # 8 processes, 5 example diffs per field
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+from config import settings
+from models.property import PropertyData
+from services.html_archive import html_archive, read_object
+from services.normalize import normalize_areas, normalize_prices
+from services.property_parser import listing_key, parse_listing_raw
+
+RUNS_DIR = settings.state_dir / "reparse"
+PAGE_SUFFIXES = (".html", ".htm", ".html.gz", ".html.br")
+
+# (key, url, path of the saved page)
+Page = Tuple[str, str, str]
+
+def archive_pages() -> List[Page]:
+    """Newest snapshot of every listing in the HTML archive"""
+    return [
+        (key, url, str(html_archive.object_path(sha256, codec)))
+        for key, url, sha256, codec in html_archive.iter_latest()
+    ]
+
+def directory_pages(directory: Path) -> List[Page]:
+    """
+    Saved pages in a directory. URLs come from a listings.json
+    (filename -> URL) next to them when there is one, else the file name.
+    """
+    urls = {}
+    mapping = directory / "listings.json"
+    if mapping.exists():
+        urls = json.loads(mapping.read_text(encoding="utf-8"))
+
+    pages = []
+    for path in sorted(directory.iterdir()):
+        if path.name.endswith(PAGE_SUFFIXES):
+            url = urls.get(path.name, path.name)
+            pages.append((listing_key(url), url, str(path)))
+    return pages
+
+# (key, url, fields, error, html bytes, raw price / area strings)
+Result = Tuple[str, str, Optional[dict], Optional[str], int, Dict[str, Optional[str]]]
+
+def parse_page(page: Page) -> Result:
+    """Worker: parse one saved page, leaving price and sizes as raw strings"""
+    key, url, path = page
+    try:
+        html = read_object(Path(path))
+        data, raw = parse_listing_raw(html, url)
+        return key, url, data.dict(), None, len(html), raw
+    except Exception as e:
+        return key, url, None, f"{type(e).__name__}: {e}", 0, {}
+
+# ---------------------------------------------------------------------------
+# Columnar output
+
+# Column types for the PropertyData fields, everything else is text
+NUMBER_FIELDS = ("price_usd", "bedrooms", "bathrooms", "size_sqm", "land_size_sqm", "floor_level")
+BOOL_FIELDS = ("has_land", "is_foreign_eligible_direct")
+LIST_FIELDS = ("recommended_structures",)
+# Fields parsed from raw strings a column at a time
+NORMALIZED_FIELDS = {"price_usd": normalize_prices, "size_sqm": normalize_areas, "land_size_sqm": normalize_areas}
+FIELDS = list(PropertyData(id="", url="", type="").dict())
+
+def to_columns(results: List[Result]) -> Dict[str, np.ndarray]:
+    """One array per PropertyData field (plus key, url, error)"""
+    columns = {
+        "key": np.array([r[0] for r in results], dtype=str),
+        "url": np.array([r[1] for r in results], dtype=str),
+        "error": np.array([r[3] or "" for r in results], dtype=str),
+    }
+    for name in FIELDS:
+        values = [r[2][name] if r[2] else None for r in results]
+        if name in NORMALIZED_FIELDS:
+            columns[name] = NORMALIZED_FIELDS[name]([r[5].get(name) or "" for r in results])
+        elif name in NUMBER_FIELDS:
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        elif name in BOOL_FIELDS:
+            columns[name] = np.array([bool(v) for v in values], dtype=bool)
+        elif name in LIST_FIELDS:
+            columns[name] = np.array([",".join(v or []) for v in values], dtype=str)
+        else:
+            columns[name] = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    return columns
+
+def previous_run(out: Path) -> Optional[Path]:
+    """Newest earlier run next to the output file"""
+    runs = sorted(p for p in out.parent.glob("run-*.npz") if p != out)
+    return runs[-1] if runs else None
+
+# ---------------------------------------------------------------------------
+# Diffs
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+def diff_runs(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray], show: int = 3):
+    old_rows = {key: i for i, key in enumerate(old["key"].tolist())}
+    new_rows = {key: i for i, key in enumerate(new["key"].tolist())}
+    common = [key for key in new_rows if key in old_rows]
+    added = len(new_rows) - len(common)
+    removed = len(old_rows) - len(common)
+    print(f"\n🔍 Compared {len(common)} listings with the previous run "
+          f"({added} new, {removed} no longer present)")
+
+    fields = [name for name in new if name not in ("key", "url") and name in old]
+    changed_any = False
+    for name in fields:
+        old_values, new_values = old[name].tolist(), new[name].tolist()
+        changes = [
+            (key, old_values[old_rows[key]], new_values[new_rows[key]])
+            for key in common
+            if not _same(old_values[old_rows[key]], new_values[new_rows[key]])
+        ]
+        if not changes:
+            continue
+        changed_any = True
+        print(f"   {name}: {len(changes)} changed")
+        for key, before, after in changes[:show]:
+            print(f"      {key}: {before!r} -> {after!r}")
+    if not changed_any:
+        print("   No field changed")
+
+# ---------------------------------------------------------------------------
+
+def reparse(pages: List[Page], workers: int, out: Path, show: int):
+    if not pages:
+        print("⚠️  No saved pages found")
+        return
+
+    print(f"🔨 Re-parsing {len(pages)} pages with {workers} processes...")
+    start = time.perf_counter()
+    chunksize = max(1, len(pages) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(parse_page, pages, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    errors = [r for r in results if r[3]]
+    html_mb = sum(r[4] for r in results) / 1e6
+    print(f"⏱️  {len(results)} pages in {elapsed:.2f}s: {len(results) / elapsed:.1f} pages/s, "
+          f"{html_mb / elapsed:.1f} MB/s of HTML, {len(errors)} errors")
+    for key, url, _, error, _, _ in errors[:show]:
+        print(f"   ❌ {key}: {error}")
+
+    columns = to_columns(results)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(out, **columns)
+    print(f"✅ Wrote {out}")
+
+    previous = previous_run(out)
+    if previous is None:
+        print("   (no previous run to compare with)")
+        return
+    with np.load(previous, allow_pickle=False) as old:
+        print(f"   Previous run: {previous.name}")
+        diff_runs({name: old[name] for name in old.files}, columns, show=show)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse saved listing HTML with the current extractors")
+    parser.add_argument("--dir", type=Path, default=None, help="directory of saved pages (default: the HTML archive)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    parser.add_argument("--out", type=Path, default=None, help="output .npz (default: <STATE_DIR>/reparse/run-<timestamp>.npz)")
+    parser.add_argument("--show", type=int, default=3, help="example diffs to print per field")
+    args = parser.parse_args()
+
+    pages = directory_pages(args.dir) if args.dir else archive_pages()
+    out = args.out or RUNS_DIR / f"run-{datetime.now():%Y%m%d-%H%M%S}.npz"
+    reparse(pages, workers=args.workers, out=out, show=args.show)
@@ -0,0 +1,274 @@
+import re
+import time
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from config import settings
+from services.knowledge_base import question_intents
+from services.metrics import metrics
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Files whose changes make every cached answer stale
+INVALIDATING_FILES = [
+    BACKEND_DIR / "prompts" / "system_prompt.txt",
+    BACKEND_DIR / "prompts" / "property_question.txt",
+    BACKEND_DIR / "data" / "faiss_index" / "knowledge_base.manifest.json",
+]
+
+def eligibility_profile(property_data) -> Tuple:
+    """
+    The PropertyData facts an ownership answer depends on.
+
+    Properties with the same profile get the same legal explanation.
+    """
+    floor = None
+    if property_data.type == "condo" and property_data.floor_level is not None:
+        floor = "ground" if property_data.floor_level < 2 else "upper"
+    return (
+        property_data.type,
+        property_data.ownership_type,
+        floor,
+        property_data.has_land,
+        property_data.is_foreign_eligible_direct,
+        tuple(property_data.recommended_structures),
+    )
+
+
+def answer_profile(property_data, question: str) -> Optional[Tuple]:
+    """
+    Key under which answers to `question` about this listing can be shared,
+    or None when the answer is specific to the listing.
+
+    Answers are written for "THIS SPECIFIC property" and may name its
+    location, so the location is part of the key (units in one development
+    share answers). Cost questions are never shared: their answers quote
+    the listing's price and the taxes computed from it.
+    """
+    if "costs_fees" in question_intents(question):
+        return None
+    location = (property_data.location or "").strip().lower()
+    return eligibility_profile(property_data) + (location,)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercased words, punctuation and spacing dropped: the exact-match key"""
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+class _Entry:
+    __slots__ = ("profile", "question", "text", "embedding", "answer", "created_at")
+
+    def __init__(self, profile, question, text, embedding, answer, created_at):
+        self.profile = profile
+        self.question = question
+        self.text = text
+        self.embedding = embedding
+        self.answer = answer
+        self.created_at = created_at
+
+
+class AnswerCache:
+    """
+    Semantic answer cache: (eligibility profile, question embedding) -> answer.
+
+    A lookup hits when a cached question for the same profile has the same
+    normalised text (see normalize_question), or cosine similarity >=
+    `threshold` with the new question. Questions without an embedding (the
+    lexical fast path, a failed embeddings call) can only match on text;
+    they are counted in `unembedded_lookups` / `unembedded_stores`. Entries expire after
+    `ttl` seconds, the least recently used are evicted past `max_entries`,
+    and everything is dropped when the system prompt or the knowledge index
+    changes on disk.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 86400.0, threshold: float = 0.92,
+                 watched_files: Optional[List[Path]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.watched_files = watched_files or []
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_profile: Dict[Tuple, List[int]] = {}
+        self._by_text: Dict[Tuple, int] = {}
+        self._ids = count()
+        self._fingerprint = self._current_fingerprint()
+        self.hits = 0
+        self.text_matches = 0
+        self.misses = 0
+        self.unembedded_lookups = 0
+        self.unembedded_stores = 0
+        self.invalidations = 0
+
+    def _current_fingerprint(self) -> Tuple:
+        fingerprint = []
+        for path in self.watched_files:
+            try:
+                stat = path.stat()
+                fingerprint.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                fingerprint.append((str(path), None, None))
+        return tuple(fingerprint)
+
+    def _check_invalidation(self):
+        fingerprint = self._current_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            if self._entries:
+                self.invalidations += 1
+                print("♻️  Prompt or knowledge index changed, clearing answer cache")
+            self.clear()
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _expired(self, entry_id: int, now: float) -> bool:
+        if now - self._entries[entry_id].created_at > self.ttl:
+            self._remove(entry_id)
+            return True
+        return False
+
+    def _exact(self, profile: Tuple, question: str) -> Optional[int]:
+        """Id of the live entry for the same normalised question, if any"""
+        entry_id = self._by_text.get((profile, normalize_question(question)))
+        if entry_id is None or self._expired(entry_id, time.time()):
+            return None
+        return entry_id
+
+    def _best(self, profile: Tuple, embedding: np.ndarray, threshold: float) -> Optional[int]:
+        """Id of the most similar live entry for this profile, at least `threshold`"""
+        now = time.time()
+        query = self._unit(np.asarray(embedding, dtype=np.float32))
+
+        best_id, best_score = None, threshold
+        for entry_id in list(self._by_profile.get(profile, [])):
+            if self._expired(entry_id, now):
+                continue
+            entry = self._entries[entry_id]
+            if entry.embedding is None:
+                continue
+            score = float(np.dot(query, entry.embedding))
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+        return best_id
+
+    def lookup(self, profile: Tuple, question: str, embedding: Optional[np.ndarray]) -> Optional[str]:
+        """Cached answer for the same or a similar enough question about this profile"""
+        self._check_invalidation()
+        if embedding is None:
+            self.unembedded_lookups += 1
+        best_id = self._exact(profile, question)
+        if best_id is not None:
+            self.text_matches += 1
+        elif embedding is not None:
+            best_id = self._best(profile, embedding, self.threshold)
+        if best_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id].answer
+
+    def nearest(self, profile: Tuple, question: str, embedding: Optional[np.ndarray],
+                threshold: float) -> Optional[str]:
+        """
+        Same question, else the closest cached answer at a looser
+        `threshold`, for when the model can't be reached. Not counted as a
+        hit or miss.
+        """
+        self._check_invalidation()
+        best_id = self._exact(profile, question)
+        if best_id is None and embedding is not None:
+            best_id = self._best(profile, embedding, threshold)
+        return self._entries[best_id].answer if best_id is not None else None
+
+    def store(self, profile: Tuple, question: str, embedding: Optional[np.ndarray], answer: str):
+        self._check_invalidation()
+        if embedding is None:
+            self.unembedded_stores += 1
+        text_key = (profile, normalize_question(question))
+        if text_key in self._by_text:
+            self._remove(self._by_text[text_key])
+        entry_id = next(self._ids)
+        unit = self._unit(np.asarray(embedding, dtype=np.float32)) if embedding is not None else None
+        self._entries[entry_id] = _Entry(profile, question, text_key[1], unit, answer, time.time())
+        self._by_profile.setdefault(profile, []).append(entry_id)
+        self._by_text[text_key] = entry_id
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_profile[entry.profile]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_profile[entry.profile]
+        del self._by_text[(entry.profile, entry.text)]
+
+    def clear(self):
+        self._entries.clear()
+        self._by_profile.clear()
+        self._by_text.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "profiles": len(self._by_profile),
+            "hits": self.hits,
+            "text_matches": self.text_matches,
+            "misses": self.misses,
+            "unembedded_lookups": self.unembedded_lookups,
+            "unembedded_stores": self.unembedded_stores,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_SIZE,
+    ttl=settings.ANSWER_CACHE_TTL,
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+    watched_files=INVALIDATING_FILES,
+)
+
+_unembedded = metrics.counter(
+    "answer_cache_unembedded_total",
+    "Answer cache lookups and stores without a question embedding (text match only)", ("op",)
+)
+
+
+def _collect():
+    _unembedded.set_total(answer_cache.unembedded_lookups, op="lookup")
+    _unembedded.set_total(answer_cache.unembedded_stores, op="store")
+
+metrics.on_collect(_collect)
+
+def lookup_answer(property_data, question: str, embedding: Optional[np.ndarray]) -> Optional[str]:
+    """Cached answer for the same or a similar question about an equivalent listing"""
+    profile = answer_profile(property_data, question)
+    if not settings.ANSWER_CACHE_ENABLED or profile is None:
+        return None
+    return answer_cache.lookup(profile, question, embedding)
+
+def store_answer(property_data, question: str, embedding: Optional[np.ndarray], answer: str):
+    """Remember a fully generated answer (matched on text alone without an embedding)"""
+    profile = answer_profile(property_data, question)
+    if settings.ANSWER_CACHE_ENABLED and answer and profile is not None:
+        answer_cache.store(profile, question, embedding, answer)
+
+_TOKENS = re.compile(r"\S+\s*|\s+")
+
+async def replay_answer(answer: str, words_per_chunk: int = 3) -> AsyncIterator[str]:
+    """Replay a cached answer as a stream of small chunks, whitespace intact"""
+    pieces = _TOKENS.findall(answer)
+    for i in range(0, len(pieces), words_per_chunk):
+        yield "".join(pieces[i:i + words_per_chunk])
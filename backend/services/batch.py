@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from models.property import PropertyData
+from services.answer_cache import answer_profile, lookup_answer, store_answer
+from services.embeddings import aembed_query
+from services.knowledge_base import get_relevant_knowledge
+from services.openai_service import call_openai, load_system_prompt
+from services.model_scheduler import ModelUnavailable
+from services.fallback import fallback_answer
+from services.property_cache import get_property
+from config import settings
+
+
+def ndjson_line(event_type: str, **fields) -> bytes:
+    return (json.dumps({"type": event_type, **fields}) + "\n").encode("utf-8")
+
+
+class BatchRun:
+    """
+    One batch of listings x questions.
+
+    Listings are fetched with at most `concurrency` in flight. Answers are
+    keyed by (answer profile, question): the first listing with a given
+    profile starts retrieval and generation, later ones await the same task,
+    exactly like the answer cache shares answers between such listings.
+    Cost questions have no shared profile and are answered per listing.
+    """
+
+    def __init__(self, urls: List[str], questions: List[str], concurrency: int = 8):
+        self.urls = list(dict.fromkeys(urls))
+        self.questions = list(dict.fromkeys(questions))
+        self.concurrency = concurrency
+        self._fetch_slots = asyncio.Semaphore(concurrency)
+        self._generate_slots = asyncio.Semaphore(concurrency)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._groups: Dict[Tuple, asyncio.Task] = {}
+        self._embeddings: Dict[str, asyncio.Task] = {}
+        self._system_prompt: Optional[str] = None
+        self.started = time.perf_counter()
+        self.generations = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    async def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            return await aembed_query(question)
+        except Exception as e:
+            print(f"Question embedding failed, using fallback knowledge: {e}")
+            return None
+
+    async def _answer_group(self, property_data: PropertyData, question: str) -> Tuple[str, bool]:
+        """(answer, from answer cache) for this listing's profile and question"""
+        embedding = await self._embeddings[question]
+        cached = lookup_answer(property_data, question, embedding)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached, True
+
+        knowledge = await get_relevant_knowledge(
+            property_data,
+            question,
+            use_vector_search=embedding is not None,
+            question_embedding=embedding,
+        )
+        try:
+            async with self._generate_slots:
+                # Own lane in model_scheduler: takes turns with interactive calls
+                answer = await call_openai(property_data, knowledge, question, self._system_prompt, lane="batch")
+        except ModelUnavailable as e:
+            print(f"⚠️  Model unavailable, batch answer from fallback: {e}")
+            self.fallbacks += 1
+            return fallback_answer(property_data, question, embedding), False
+        self.generations += 1
+        store_answer(property_data, question, embedding, answer)
+        return answer, False
+
+    async def _process(self, url: str):
+        async with self._fetch_slots:
+            property_data = await get_property(url)
+        await self._queue.put(ndjson_line("property", url=url, data=property_data.dict()))
+
+        pending = []
+        for question in self.questions:
+            # Listing-specific questions (costs) get a generation of their own
+            profile = answer_profile(property_data, question)
+            key = (profile if profile is not None else ("listing", url), question)
+            shared = key in self._groups
+            if not shared:
+                self._groups[key] = asyncio.create_task(self._answer_group(property_data, question))
+            pending.append((question, shared, self._groups[key]))
+
+        for question, shared, task in pending:
+            try:
+                answer, cached = await task
+                line = ndjson_line("answer", url=url, question=question, answer=answer,
+                                   shared=shared, cached=cached)
+            except Exception as e:
+                self.errors += 1
+                print(f"Batch answer failed for {url}: {e}")
+                line = ndjson_line("error", url=url, question=question, error=str(e))
+            await self._queue.put(line)
+
+    def summary(self) -> dict:
+        return {
+            "properties": len(self.urls),
+            "questions": len(self.questions),
+            "groups": len(self._groups),
+            "generations": self.generations,
+            "answer_cache_hits": self.cache_hits,
+            "fallbacks": self.fallbacks,
+            "errors": self.errors,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+        }
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """NDJSON lines in completion order, then a summary line"""
+        self._system_prompt = await asyncio.to_thread(load_system_prompt)
+        for question in self.questions:
+            self._embeddings[question] = asyncio.create_task(self._embed(question))
+
+        workers = [asyncio.create_task(self._process(url)) for url in self.urls]
+        remaining = len(workers)
+        for worker in workers:
+            worker.add_done_callback(lambda _: self._queue.put_nowait(None))
+
+        try:
+            while remaining:
+                line = await self._queue.get()
+                if line is None:
+                    remaining -= 1
+                    continue
+                yield line
+
+            summary = self.summary()
+            print(f"⏱️  Batch of {summary['properties']} listings x {summary['questions']} questions: "
+                  f"{summary['groups']} profile groups, {summary['generations']} generations, "
+                  f"{summary['elapsed_ms']:.0f}ms")
+            yield ndjson_line("done", **summary)
+        finally:
+            # Client went away or the batch finished: stop outstanding work
+            for task in [*workers, *self._groups.values(), *self._embeddings.values()]:
+                task.cancel()
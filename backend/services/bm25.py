@@ -0,0 +1,133 @@
+"""
+In-process BM25 over the knowledge chunks.
+
+An inverted index (term -> postings of chunk id and term frequency) built
+once from the same chunks as the FAISS index. It ranks without any network
+call, so clearly lexical questions can skip the query embedding, and its
+ranking is fused with the vector ranking otherwise (reciprocal rank fusion).
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+%?")
+STOPWORDS = frozenset(
+    "a about an and any are as at be buy buying by can could do does for from get have how i if in "
+    "is it its me my of on or should so that the there this to want what when where which who why "
+    "will with would you your".split()
+    # Question filler: says nothing about which chunk answers it
+    + "apply applies expect explain here know need please recommend tell through".split()
+)
+
+
+def _stem(word: str) -> str:
+    """Plural folding only: 'taxes' -> 'tax', 'properties' -> 'property', 'fees' -> 'fee'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("xes", "sses", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(word) for word in _TOKEN.findall(text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks.
+
+    `search` has the same result shape as VectorStore.search_by_vector
+    ((text, metadata, score), best first; higher scores are better) and the
+    same `sources` filter on metadata["source"].
+    """
+
+    def __init__(self, texts: Sequence[str], metadata: Optional[Sequence[dict]] = None,
+                 k1: float = 1.2, b: float = 0.75):
+        self.texts = list(texts)
+        self.metadata = list(metadata) if metadata else [{} for _ in self.texts]
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        self._source_ids: Dict[Optional[str], set] = {}
+        for doc_id, text in enumerate(self.texts):
+            terms = Counter(tokenize(text))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+            self._source_ids.setdefault(self.metadata[doc_id].get("source"), set()).add(doc_id)
+
+        n_docs = len(self.texts)
+        self.avg_length = sum(self.lengths) / n_docs if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _allowed(self, sources: Optional[Iterable[str]]) -> Optional[set]:
+        if sources is None:
+            return None
+        return set().union(*(self._source_ids.get(source, set()) for source in sources))
+
+    def scores(self, query: str, sources: Optional[Iterable[str]] = None) -> Dict[int, float]:
+        allowed = self._allowed(sources)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = 1 - self.b + self.b * self.lengths[doc_id] / self.avg_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def search(self, query: str, k: int = 3,
+               sources: Optional[Iterable[str]] = None) -> List[Tuple[str, dict, float]]:
+        best = heapq.nlargest(k, self.scores(query, sources).items(), key=lambda item: item[1])
+        return [(self.texts[doc_id], self.metadata[doc_id], score) for doc_id, score in best]
+
+    def coverage(self, query: str) -> float:
+        """
+        Share of the query's content words that occur in the chunks.
+
+        1.0 means every content word of the question appears somewhere, so a
+        lexical ranking has everything it needs; words the chunks never use
+        (paraphrases, synonyms) pull it down and call for the vector search.
+        Words are not idf-weighted: with a handful of chunks the idf of a
+        word every chunk uses is near zero, so one unseen word would
+        outweigh all the others.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        return sum(term in self.idf for term in terms) / len(terms)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[str, dict, float]]], k: int,
+                           rrf_k: int = 60) -> List[Tuple[str, dict, float]]:
+    """
+    Merge several best-first result lists into one.
+
+    Each chunk scores sum(1 / (rrf_k + rank)) over the lists it appears in,
+    so raw scores on different scales (BM25, L2 distance, cosine) never have
+    to be compared. Chunks are matched by text.
+    """
+    fused: Dict[str, List] = {}
+    for ranking in rankings:
+        for rank, (text, metadata, _) in enumerate(ranking, start=1):
+            entry = fused.setdefault(text, [text, metadata, 0.0])
+            entry[2] += 1.0 / (rrf_k + rank)
+    best = sorted(fused.values(), key=lambda entry: entry[2], reverse=True)[:k]
+    return [tuple(entry) for entry in best]
@@ -0,0 +1,183 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from services.prompts import estimate_tokens
+
+SEPARATOR = "\n\n"
+
+_HEADING = re.compile(r"^(?=#{1,6} )", re.MULTILINE)
+_WORD = re.compile(r"[a-z0-9%]+")
+_WORD_SPAN = re.compile(r"\S+\s*")
+_STOPWORDS = frozenset(
+    "a an and are as at be buy can do does for from how i if in is it its me my of on or "
+    "the this to what when where which who why will with you your".split()
+)
+
+
+@dataclass
+class PackedContext:
+    """Packed knowledge text plus what packing removed"""
+    text: str
+    tokens: int
+    tokens_in: int
+    passages_in: int
+    passages_used: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens
+
+
+class PackerStats:
+    """Running totals across requests"""
+
+    def __init__(self):
+        self.packed = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.truncated = 0
+
+    def record(self, packed: PackedContext):
+        self.packed += 1
+        self.tokens_in += packed.tokens_in
+        self.tokens_out += packed.tokens
+        if packed.passages_used < packed.passages_in:
+            self.truncated += 1
+
+    def stats(self) -> dict:
+        return {
+            "packed": self.packed,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+            "truncated": self.truncated,
+        }
+
+
+# Global packer statistics
+packer_stats = PackerStats()
+
+
+def _overlap(a: List[str], b: List[str], max_overlap: int) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b`"""
+    for n in range(min(len(a), len(b), max_overlap), 0, -1):
+        if a[-n:] == b[:n]:
+            return n
+    return 0
+
+
+def strip_overlaps(passages: Sequence[str], max_overlap: int = 100) -> List[Tuple[int, str]]:
+    """
+    Remove text a passage shares with higher ranked ones.
+
+    Chunks are cut with a word overlap (see `chunk_text`), so two neighbouring
+    chunks repeat up to `max_overlap` words at their seam; a passage fully
+    contained in an earlier one is dropped. Returns (input position, text).
+    """
+    kept: List[List[str]] = []
+    positions: List[int] = []
+    for position, passage in enumerate(passages):
+        words = passage.split()
+        joined = " ".join(words)
+        if not words or any(joined in " ".join(prev) for prev in kept):
+            continue
+        for prev in kept:
+            head = _overlap(prev, words, max_overlap)
+            if head:
+                words = words[head:]
+            tail = _overlap(words, prev, max_overlap)
+            if tail:
+                words = words[:-tail]
+        if words:
+            kept.append(words)
+            positions.append(position)
+    return [(position, " ".join(words)) for position, words in zip(positions, kept)]
+
+
+def _trim_to_budget(text: str, budget: int) -> str:
+    """Longest line or sentence aligned prefix (word aligned as a fallback) within budget"""
+    if budget <= 0:
+        return ""
+    ends = [match.end() for match in _WORD_SPAN.finditer(text)]
+    low, high = 0, len(ends)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:ends[mid - 1]]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    trimmed = text[:ends[low - 1]].rstrip() if low else ""
+    boundary = max(trimmed.rfind("\n"), trimmed.rfind(". ") + 1)
+    if boundary > len(trimmed) // 2:
+        trimmed = trimmed[:boundary].rstrip()
+    return trimmed
+
+
+def pack(passages: Sequence[str], budget: int, dedupe: bool = True,
+         order: Optional[Sequence[int]] = None) -> PackedContext:
+    """
+    Pack ranked passages (best first) into at most `budget` tokens.
+
+    Overlapping text is removed first, passages are then taken in rank order
+    and the first one that doesn't fit is trimmed to the remaining budget.
+    With `order` (a sort key per passage, e.g. its place in the document)
+    the chosen passages are emitted in that order instead of rank order.
+    """
+    tokens_in = estimate_tokens(SEPARATOR.join(passages))
+    if dedupe:
+        candidates = strip_overlaps(passages)
+    else:
+        candidates = [(position, p) for position, p in enumerate(passages) if p.strip()]
+    separator_tokens = estimate_tokens(SEPARATOR)
+
+    selected, used = [], 0
+    for position, passage in candidates:
+        cost = estimate_tokens(passage) + (separator_tokens if selected else 0)
+        if used + cost <= budget:
+            selected.append((position, passage))
+            used += cost
+            continue
+        remaining = budget - used - (separator_tokens if selected else 0)
+        trimmed = _trim_to_budget(passage, remaining)
+        if trimmed:
+            selected.append((position, trimmed))
+        break
+
+    if order is not None:
+        selected.sort(key=lambda item: order[item[0]])
+    text = SEPARATOR.join(passage for _, passage in selected)
+    packed = PackedContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        tokens_in=tokens_in,
+        passages_in=len(passages),
+        passages_used=len(selected),
+    )
+    packer_stats.record(packed)
+    return packed
+
+
+def _terms(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def split_sections(document: str) -> List[str]:
+    """Markdown document split at its headings, each section keeps its heading"""
+    return [section.strip() for section in _HEADING.split(document) if section.strip()]
+
+
+def rank_sections(documents: Sequence[str], question: str) -> List[Tuple[int, str]]:
+    """
+    Sections of whole knowledge files, most relevant to the question first,
+    as (document position, section).
+
+    Used when there's no vector index: sections are scored by how many of
+    the question's terms they contain, ties keep document order.
+    """
+    question_terms = _terms(question)
+    sections: List[Tuple[int, int, str]] = []
+    for section in (s for document in documents for s in split_sections(document)):
+        score = len(question_terms & _terms(section))
+        sections.append((-score, len(sections), section))
+    return [(position, section) for _, position, section in sorted(sections)]
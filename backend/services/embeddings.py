@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
+from config import settings
+from services.metrics import span
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """Normalise query text so trivially different queries share an embedding"""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+def cache_key(text: str, model: str) -> str:
+    """Cache key for an exact text under a given embedding model"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: in-memory LRU in front of a SQLite file.
+
+    The SQLite file is shared by every worker process and survives restarts,
+    so repeat queries never hit the network once any worker has seen them.
+    """
+
+    def __init__(self, path: Optional[Path], max_memory_items: int = 2048):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+        return self._conn
+
+    def get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up memory, then disk"""
+        vector = self.get_memory(key)
+        if vector is not None or self.path is None:
+            if vector is None:
+                self.misses += 1
+            return vector
+
+        with self._lock:
+            row = self._db().execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self._remember(key, vector)
+        return vector
+
+    def put(self, key: str, model: str, vector: np.ndarray):
+        self.put_many([key], model, [vector])
+
+    def put_many(self, keys: List[str], model: str, vectors: List[np.ndarray]):
+        """Store vectors in one transaction (a build checkpoint)"""
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        for key, vector in zip(keys, vectors):
+            self._remember(key, vector)
+        if self.path is None:
+            return
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, model, vector.tobytes()) for key, vector in zip(keys, vectors)],
+            )
+            db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+class OpenAIEmbeddingProvider:
+    """Embeddings from the OpenAI API (many inputs per request)"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+        self._sync_client = None
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        response = await self._async_client.embeddings.create(input=list(texts), model=self.model)
+        return [np.array(item.embedding, dtype=np.float32) for item in response.data]
+
+    def embed_sync(self, texts: Sequence[str]) -> List[np.ndarray]:
+        if self._sync_client is None:
+            self._sync_client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+        response = self._sync_client.embeddings.create(input=list(texts), model=self.model)
+        return [np.array(item.embedding, dtype=np.float32) for item in response.data]
+
+
+class FakeEmbeddingProvider:
+    """
+    Deterministic offline embeddings for tests and local builds.
+
+    Hashes word unigrams into a fixed number of buckets and L2-normalises the
+    counts, so texts sharing words land close together without any network.
+    """
+
+    _TOKEN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimension: int = 1536):
+        self.dimension = dimension
+        self.model = f"fake-hashing-{dimension}"
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in self._TOKEN.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[bucket % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return self.embed_sync(texts)
+
+    def embed_sync(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return [self._vector(text) for text in texts]
+
+
+def create_provider(name: Optional[str] = None):
+    """Embedding provider by name ("openai" or "fake")"""
+    name = name or settings.EMBEDDING_PROVIDER
+    if name == "openai":
+        return OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL)
+    if name == "fake":
+        return FakeEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider: {name!r}")
+
+
+# Global embedding cache and provider
+embedding_cache = EmbeddingCache(
+    settings.state_dir / "embedding_cache.sqlite3",
+    max_memory_items=settings.EMBEDDING_CACHE_SIZE,
+)
+provider = create_provider()
+
+# Concurrent requests for the same query share one API call
+_inflight: Dict[str, asyncio.Future] = {}
+
+def embed_text(text: str) -> np.ndarray:
+    """Embed exact text synchronously (scripts), using the cache"""
+    key = cache_key(text, provider.model)
+    vector = embedding_cache.get(key)
+    if vector is None:
+        vector = provider.embed_sync([text])[0]
+        embedding_cache.put(key, provider.model, vector)
+    return vector
+
+async def aembed_text(text: str) -> np.ndarray:
+    """Embed exact text without blocking the event loop, using the cache"""
+    key = cache_key(text, provider.model)
+
+    vector = embedding_cache.get_memory(key)
+    if vector is not None:
+        return vector
+
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_embedding(key, text))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(future)
+
+async def _fetch_embedding(key: str, text: str) -> np.ndarray:
+    # SQLite lookups are quick but still file IO, keep them off the loop
+    vector = await asyncio.to_thread(embedding_cache.get, key)
+    if vector is not None:
+        return vector
+
+    with span("embedding_api"):
+        vector = (await provider.embed([text]))[0]
+    await asyncio.to_thread(embedding_cache.put, key, provider.model, vector)
+    return vector
+
+def embed_query(query: str) -> np.ndarray:
+    """Embed a search query (normalised) synchronously"""
+    return embed_text(normalize_query(query))
+
+async def aembed_query(query: str) -> np.ndarray:
+    """Embed a search query (normalised) asynchronously"""
+    return await aembed_text(normalize_query(query))
+
+async def cached_query_embedding(query: str) -> Optional[np.ndarray]:
+    """Embedding of a search query if it is cached (memory or disk), never calls the API"""
+    key = cache_key(normalize_query(query), provider.model)
+    vector = embedding_cache.get_memory(key)
+    if vector is None:
+        vector = await asyncio.to_thread(embedding_cache.get, key)
+    return vector
+
+async def embed_documents(
+    texts: Sequence[str],
+    embedder=None,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    on_batch=None,
+) -> np.ndarray:
+    """
+    Embed many documents, returning a (len(texts), dim) matrix in input order.
+
+    Texts already in the cache (same content hash and model) are not
+    re-embedded, so unchanged chunks cost nothing on rebuild. The rest are
+    sent `batch_size` inputs per request with at most `concurrency` requests
+    in flight; each finished batch is written to the cache immediately, which
+    is what lets an interrupted build resume where it stopped.
+
+    `on_batch(done, total)` is called after each batch.
+    """
+    embedder = embedder or provider
+    keys = [cache_key(text, embedder.model) for text in texts]
+    vectors: List[Optional[np.ndarray]] = [embedding_cache.get(key) for key in keys]
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def run_batch(indices: List[int]):
+        nonlocal done
+        async with semaphore:
+            batch_vectors = await embedder.embed([texts[i] for i in indices])
+        embedding_cache.put_many([keys[i] for i in indices], embedder.model, batch_vectors)
+        for i, vector in zip(indices, batch_vectors):
+            vectors[i] = vector
+        done += len(indices)
+        if on_batch:
+            on_batch(done, len(missing))
+
+    await asyncio.gather(*(run_batch(indices) for indices in batches))
+    return np.array(vectors, dtype=np.float32).reshape(len(texts), -1)
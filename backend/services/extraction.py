@@ -0,0 +1,128 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+
+class PatternSet:
+    """
+    Named regex patterns matched against the page text.
+
+    Each pattern must capture its value in a named group with the same name
+    as the pattern. Patterns are compiled once at registration and each is
+    a plain `search` over the already materialised text: a combined
+    alternation would re-try every remaining pattern at every position,
+    which is slower than letting each pattern's own prefix scan run in C.
+    """
+
+    def __init__(self):
+        self._patterns: Dict[str, re.Pattern] = {}
+
+    def add(self, name: str, pattern: str):
+        """Register a pattern with a `(?P<name>...)` group"""
+        compiled = re.compile(pattern)
+        if name not in compiled.groupindex:
+            raise ValueError(f"Pattern for '{name}' must define a (?P<{name}>...) group")
+        self._patterns[name] = compiled
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._patterns
+
+    def search(self, name: str, text: str) -> Optional[re.Match]:
+        """Leftmost match of one registered pattern"""
+        return self._patterns[name].search(text)
+
+    def scan(self, text: str) -> Dict[str, re.Match]:
+        """Return the leftmost match for every pattern that occurs in text"""
+        found: Dict[str, re.Match] = {}
+        for name, compiled in self._patterns.items():
+            match = compiled.search(text)
+            if match:
+                found[name] = match
+        return found
+
+
+class ListingPage:
+    """
+    A listing page with its text materialised once for all extractors.
+
+    `text` may be supplied by a parser backend that produced it without a
+    full soup; otherwise it is taken from `soup.get_text()`.
+
+    Extractors that convert a raw string (prices, areas) go through
+    `normalized`, which keeps the raw string in `raw`. With
+    `normalize=False` they only collect it and leave the field unset, for
+    callers that convert whole columns at once (reparse.py).
+    """
+
+    def __init__(self, soup: BeautifulSoup, url: str, patterns: PatternSet, text: Optional[str] = None,
+                 normalize: bool = True):
+        self.soup = soup
+        self.url = url
+        self.text = (soup.get_text() if text is None else text).lower()
+        self.normalize = normalize
+        self.raw: Dict[str, Optional[str]] = {}
+        self._patterns = patterns
+        self._matches: Dict[str, Optional[re.Match]] = {}
+
+    def match(self, name: str) -> Optional[re.Match]:
+        """Leftmost match for a registered pattern (searched once per page)"""
+        if name not in self._matches:
+            self._matches[name] = self._patterns.search(name, self.text)
+        return self._matches[name]
+
+    def group(self, name: str) -> Optional[str]:
+        """Value captured by a registered pattern, or None"""
+        match = self.match(name)
+        return match.group(name) if match else None
+
+    def normalized(self, field: str, raw: Optional[str], parse: Callable[[str], Any]) -> Any:
+        """parse(raw) for `field`, or None when the page only collects raw strings"""
+        self.raw[field] = raw
+        return parse(raw) if self.normalize else None
+
+
+# An extractor receives the page and the fields extracted before it
+FieldExtractor = Callable[[ListingPage, Dict[str, Any]], Any]
+
+
+class ExtractionEngine:
+    """Runs pluggable field extractors over one materialised ListingPage"""
+
+    def __init__(self):
+        self.patterns = PatternSet()
+        self._extractors: List[Tuple[str, FieldExtractor]] = []
+
+    def register(self, field: str, extractor: FieldExtractor, pattern: Optional[str] = None):
+        """
+        Register (or replace) the extractor for a field.
+
+        `pattern`, when given, is added to the shared pattern set under the
+        field name and is available through `page.group(field)`.
+        """
+        if pattern is not None:
+            self.patterns.add(field, pattern)
+        self._extractors = [(f, e) for f, e in self._extractors if f != field]
+        self._extractors.append((field, extractor))
+
+    def field(self, name: str, pattern: Optional[str] = None):
+        """Decorator form of `register`"""
+        def decorator(extractor: FieldExtractor) -> FieldExtractor:
+            self.register(name, extractor, pattern)
+            return extractor
+        return decorator
+
+    def page(self, soup: BeautifulSoup, url: str, text: Optional[str] = None,
+             normalize: bool = True) -> ListingPage:
+        return ListingPage(soup, url, self.patterns, text, normalize)
+
+    def extract(self, soup: BeautifulSoup, url: str, text: Optional[str] = None) -> Dict[str, Any]:
+        """Run every extractor in registration order"""
+        return self.run(self.page(soup, url, text))
+
+    def run(self, page: ListingPage) -> Dict[str, Any]:
+        """Run every extractor in registration order over an existing page"""
+        fields: Dict[str, Any] = {}
+        for name, extractor in self._extractors:
+            fields[name] = extractor(page, fields)
+        return fields
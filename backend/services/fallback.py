@@ -0,0 +1,98 @@
+"""
+Answers for when the model can't be reached.
+
+When a chat completion is shed, the circuit is open or retries run out
+(services/model_scheduler.py), a cached answer to the same question or
+the closest one for the same answer profile (see answer_profile) is used
+at a looser similarity threshold, and failing that a short rule-based explanation built from the
+knowledge files.
+Fallback answers are never stored in the answer cache.
+"""
+
+from typing import AsyncIterator, Optional
+
+import numpy as np
+from config import settings
+from services.answer_cache import answer_cache, answer_profile, replay_answer
+from services.metrics import fallback_answers_total
+from services.model_scheduler import ModelUnavailable
+
+BUSY_NOTE = ("Our assistant is handling a lot of questions right now, so here is a short summary "
+             "of the rules for this property instead of a tailored answer. Please try again in a minute.")
+
+
+def rule_based_answer(property_data) -> str:
+    """Ownership summary from the listing's eligibility facts (see knowledge/)"""
+    lines = [BUSY_NOTE, ""]
+    if property_data.type == "condo" and property_data.is_foreign_eligible_direct:
+        lines += [
+            f"This condo is on floor {property_data.floor_level}, so a foreigner can own it directly "
+            "under strata title: full, registered ownership with no time limit.",
+            "Foreign ownership is capped at 70% of the units in a building, so check the building's "
+            "foreign quota before you commit.",
+        ]
+    elif property_data.type == "condo" and property_data.floor_level is not None and property_data.floor_level < 2:
+        lines += [
+            "Ground floor units count as in contact with the land, so foreigners cannot own them directly.",
+            "The usual options are a long-term registered lease (typically 50 years, renewable) "
+            "or a Cambodian majority-owned company.",
+        ]
+    elif property_data.has_land or property_data.type in ("villa", "house", "land"):
+        lines += [
+            "Foreigners cannot own land directly in Cambodia (Article 44 of the Constitution).",
+            "The common routes are a registered long-term lease of the land (typically 50 years, "
+            "renewable) while owning the building itself, or a company with 51% Cambodian ownership.",
+        ]
+    else:
+        lines += [
+            "Foreigners can own condo units on floor 2 and above under strata title; land and "
+            "landed houses need a long-term lease or a Cambodian majority-owned company.",
+        ]
+    lines += [
+        "",
+        "Budget around 5-6% of the price for transaction costs, including the 4% transfer tax, "
+        "and have a property lawyer check the title before you sign.",
+    ]
+    return "\n".join(lines)
+
+
+def fallback_answer(property_data, question: str, embedding: Optional[np.ndarray] = None) -> str:
+    """Closest cached answer for this profile, else the rule-based summary"""
+    profile = answer_profile(property_data, question)
+    if settings.ANSWER_CACHE_ENABLED and profile is not None:
+        cached = answer_cache.nearest(profile, question, embedding, settings.FALLBACK_CACHE_THRESHOLD)
+        if cached is not None:
+            fallback_answers_total.inc(source="cache")
+            return cached
+    fallback_answers_total.inc(source="rules")
+    return rule_based_answer(property_data)
+
+
+class FallbackStream:
+    """
+    Model deltas, or the fallback answer replayed when the model is
+    unavailable before the first delta. `fallback` tells the caller not to
+    store the result.
+    """
+
+    def __init__(self, deltas: AsyncIterator[str], property_data, question: str,
+                 embedding: Optional[np.ndarray] = None):
+        self.deltas = deltas
+        self.property_data = property_data
+        self.question = question
+        self.embedding = embedding
+        self.fallback = False
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        started = False
+        try:
+            async for delta in self.deltas:
+                started = True
+                yield delta
+        except ModelUnavailable as e:
+            if started:
+                raise
+            print(f"⚠️  Model unavailable, answering from fallback: {e}")
+            self.fallback = True
+            async for delta in replay_answer(fallback_answer(self.property_data, self.question, self.embedding)):
+                yield delta
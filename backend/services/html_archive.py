@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional, the archive falls back to gzip
+    brotli = None
+
+from config import settings
+
+CODECS = ("gzip", "br")
+_EXTENSIONS = {"gzip": ".html.gz", "br": ".html.br"}
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "br":
+        return brotli.compress(data, quality=9)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "br":
+        if brotli is None:
+            raise RuntimeError("Archive object is brotli-compressed but 'brotli' is not installed")
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def read_object(path: Path) -> str:
+    """Decompress an archived page (or read a plain .html file) by its suffix"""
+    data = Path(path).read_bytes()
+    if path.name.endswith(".br"):
+        data = _decompress(data, "br")
+    elif path.name.endswith(".gz"):
+        data = _decompress(data, "gzip")
+    return data.decode("utf-8", errors="replace")
+
+
+class HtmlArchive:
+    """
+    Content-addressed archive of raw listing HTML.
+
+    Each distinct page body is stored once, compressed, under
+    objects/<sha[:2]>/<sha>.html.gz (or .html.br), and an SQLite index maps
+    listing keys to the snapshots seen for them. Lets extractor changes be
+    re-run over every listing offline, without re-downloading.
+    """
+
+    def __init__(self, directory: Path, codec: str = "gzip"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown archive codec {codec!r} (expected one of {CODECS})")
+        if codec == "br" and brotli is None:
+            print("⚠️  Brotli archive requested but 'brotli' is not installed, using gzip")
+            codec = "gzip"
+        self.directory = Path(directory)
+        self.codec = codec
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writing: Set[str] = set()  # hashes being written by another thread
+        self.stored = 0
+        self.deduplicated = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.directory / "index.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " key TEXT NOT NULL, url TEXT NOT NULL, sha256 TEXT NOT NULL,"
+                " codec TEXT NOT NULL, size INTEGER NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (key, sha256))"
+            )
+        return self._conn
+
+    def object_path(self, sha256: str, codec: str) -> Path:
+        """Where the compressed page with this hash lives"""
+        return self.directory / "objects" / sha256[:2] / f"{sha256}{_EXTENSIONS[codec]}"
+
+    def put(self, key: str, url: str, html: str) -> str:
+        """Archive a page body for a listing; returns its sha256"""
+        raw = html.encode("utf-8")
+        sha256 = hashlib.sha256(raw).hexdigest()
+        path = self.object_path(sha256, self.codec)
+        codec = self.codec
+
+        # put() runs on the parse thread pool: claim the hash under the lock
+        # so two threads archiving the same page write (and count) it once
+        with self._lock:
+            existing = next((c for c in CODECS if self.object_path(sha256, c).exists()), None)
+            if existing is None and sha256 in self._writing:
+                existing = codec
+            if existing is not None:
+                codec = existing
+                self.deduplicated += 1
+            else:
+                self._writing.add(sha256)
+
+        if existing is None:
+            try:
+                compressed = _compress(raw, codec)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(compressed)
+                os.replace(tmp, path)
+                with self._lock:
+                    self.stored += 1
+                    self.raw_bytes += len(raw)
+                    self.compressed_bytes += len(compressed)
+            finally:
+                with self._lock:
+                    self._writing.discard(sha256)
+
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, sha256, codec, len(raw), time.time()),
+            )
+            self._db().commit()
+        return sha256
+
+    def read(self, sha256: str, codec: Optional[str] = None) -> str:
+        """Page body by content hash"""
+        codecs = [codec] if codec else list(CODECS)
+        for name in codecs:
+            path = self.object_path(sha256, name)
+            if path.exists():
+                return _decompress(path.read_bytes(), name).decode("utf-8")
+        raise FileNotFoundError(f"No archived page {sha256}")
+
+    def latest(self, key: str) -> Optional[Tuple[str, str]]:
+        """(url, html) of the newest snapshot of a listing"""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT url, sha256, codec FROM snapshots WHERE key = ?"
+                " ORDER BY fetched_at DESC LIMIT 1", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, sha256, codec = row
+        return url, self.read(sha256, codec)
+
+    def iter_latest(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(key, url, sha256, codec) of the newest snapshot of every listing"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, url, sha256, codec FROM snapshots s WHERE fetched_at = ("
+                " SELECT MAX(fetched_at) FROM snapshots WHERE key = s.key) ORDER BY key"
+            ).fetchall()
+        return iter(rows)
+
+    def stats(self) -> dict:
+        return {
+            "codec": self.codec,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "ratio": self.compressed_bytes / self.raw_bytes if self.raw_bytes else 0.0,
+        }
+
+
+# Global archive instance
+html_archive = HtmlArchive(
+    settings.state_dir / "html_archive",
+    codec=settings.HTML_ARCHIVE_CODEC,
+)
@@ -0,0 +1,60 @@
+from typing import Optional, Tuple
+
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+# Parser backends selectable through settings.HTML_PARSER
+BACKENDS = ("fast", "lxml", "html.parser")
+
+# Elements whose text BeautifulSoup.get_text() leaves out
+NON_TEXT_TAGS = ("script", "style", "template")
+
+# Everything the soup-based extractors read: title, breadcrumb, price elements
+TARGET_XPATH = " | ".join([
+    "//h1",
+    "//nav[@aria-label='breadcrumb']",
+    *(
+        f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+        for cls in ("price", "property-price", "price-sale")
+    ),
+])
+
+
+def parse_document(html: str, backend: str = "fast") -> Tuple[BeautifulSoup, Optional[str]]:
+    """
+    Parse listing HTML with the chosen backend.
+
+    Returns (soup, text). `text` is the page text for the pattern extractors,
+    or None when it should be taken from the soup itself.
+
+    - "html.parser" / "lxml": full BeautifulSoup tree with that parser.
+    - "fast": one lxml parse; page text comes straight from the lxml tree and
+      the soup only contains the nodes the soup extractors look at.
+    """
+    if backend == "fast":
+        return _parse_fast(html)
+    if backend in ("lxml", "html.parser"):
+        return BeautifulSoup(html, backend), None
+    raise ValueError(f"Unknown HTML parser backend: {backend!r} (expected one of {BACKENDS})")
+
+
+def _parse_fast(html: str) -> Tuple[BeautifulSoup, str]:
+    root = lxml.html.document_fromstring(html)
+
+    # Targets in document order, skipping ones nested inside another target
+    targets = []
+    for element in root.xpath(TARGET_XPATH):
+        if not any(parent in targets for parent in element.iterancestors()):
+            targets.append(element)
+    fragment = "".join(
+        etree.tostring(element, encoding="unicode", method="html", with_tail=False)
+        for element in targets
+    )
+    soup = BeautifulSoup(fragment, "lxml")
+
+    # Page text without script/style contents, like get_text()
+    etree.strip_elements(root, *NON_TEXT_TAGS, etree.Comment, with_tail=False)
+    text = etree.tostring(root, encoding="unicode", method="text")
+
+    return soup, text
@@ -0,0 +1,94 @@
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from config import settings
+
+# Shared application-lifetime client (created on startup)
+_client: Optional[httpx.AsyncClient] = None
+
+# Per-host concurrency caps
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; CambodiaPropertyExplainer/2.0)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+}
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _brotli_available() -> bool:
+    """httpx only decodes brotli responses with `brotli` (httpx[brotli])"""
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def accept_encoding() -> str:
+    """Encodings we can decode, best compression first"""
+    return "br, gzip, deflate" if _brotli_available() else "gzip, deflate"
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build a pooled client from settings"""
+    http2 = settings.HTTP_HTTP2 and _http2_available()
+    if settings.HTTP_HTTP2 and not http2:
+        print("⚠️  HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        headers={**DEFAULT_HEADERS, "Accept-Encoding": accept_encoding()},
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_WRITE_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+async def start_http_client():
+    """Create the shared client (FastAPI startup)"""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+
+async def close_http_client():
+    """Close the shared client and its pooled connections (FastAPI shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_semaphores.clear()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it lazily outside the app (scripts)"""
+    global _client
+    if _client is None:
+        _client = create_http_client()
+    return _client
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc.lower()
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.HTTP_MAX_PER_HOST)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+async def fetch(url: str, **kwargs) -> httpx.Response:
+    """GET url through the shared pool, capped per host"""
+    async with _host_semaphore(url):
+        return await get_http_client().get(url, **kwargs)
@@ -0,0 +1,94 @@
+import faiss
+import numpy as np
+
+# Index kinds selectable through settings.INDEX_TYPE
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+METRICS = ("l2", "cosine")
+
+
+def create_index(kind: str, dimension: int, metric: str = "l2", n_vectors: int = 0,
+                 hnsw_m: int = 32, ef_construction: int = 200,
+                 nlist: int = 0, pq_m: int = 64, pq_nbits: int = 8):
+    """
+    Create an empty FAISS index.
+
+    - "flat":  exact search, no training, fine up to tens of thousands of chunks
+    - "hnsw":  graph index, no training, fast and high recall, more memory
+    - "ivfpq": inverted lists + product quantisation, needs training, smallest
+
+    With metric "cosine" the index uses inner product and callers must
+    L2-normalise vectors (see `prepare_vectors`). `n_vectors` sizes the IVF
+    coarse quantiser when `nlist` is 0.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {kind!r} (expected one of {INDEX_TYPES})")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r} (expected one of {METRICS})")
+
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+    if kind == "flat":
+        return faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss_metric)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    nlist = nlist or default_nlist(n_vectors)
+    quantizer = faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_nbits, faiss_metric)
+
+
+def default_nlist(n_vectors: int) -> int:
+    """Rule of thumb: about 4 * sqrt(n) inverted lists"""
+    return max(1, int(4 * np.sqrt(max(n_vectors, 1))))
+
+
+def min_training_points(index) -> int:
+    """
+    Smallest training set the index can be trained on (0 = no training).
+
+    k-means needs at least one point per centroid; faiss recommends ~39 and
+    warns below that, but still trains.
+    """
+    if index.is_trained:
+        return 0
+    ivf = faiss.downcast_index(faiss.extract_index_ivf(index))
+    pq_points = 2 ** ivf.pq.nbits if hasattr(ivf, "pq") else 0
+    return max(ivf.nlist, pq_points)
+
+
+def prepare_vectors(vectors: np.ndarray, metric: str) -> np.ndarray:
+    """float32, contiguous, and unit length for cosine"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if metric == "cosine":
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def set_search_params(index, nprobe: int = 0, ef_search: int = 0):
+    """Apply query-time tuning knobs that the index understands"""
+    params = faiss.ParameterSpace()
+    if nprobe and _is_ivf(index):
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search and _is_hnsw(index):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+
+def _is_ivf(index) -> bool:
+    try:
+        faiss.extract_index_ivf(index)
+        return True
+    except RuntimeError:
+        return False
+
+
+def _is_hnsw(index) -> bool:
+    return isinstance(faiss.downcast_index(index), faiss.IndexHNSW)
+
+
+def index_metric(index) -> str:
+    """Metric an existing index was built for"""
+    return "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
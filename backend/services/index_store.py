@@ -0,0 +1,204 @@
+"""
+On-disk format for the knowledge base index (format version 2).
+
+For an index called NAME the directory holds:
+
+    NAME.index          FAISS index, opened memory-mapped and read-only
+    NAME.texts.bin      all chunk texts, UTF-8, back to back
+    NAME.offsets.npy    int64 byte offsets into texts.bin (count + 1 entries)
+    NAME.meta.json      chunk metadata stored column-wise
+    NAME.manifest.json  format version, embedding model, dimension, checksums
+
+Everything except the small JSON files is memory-mapped, so worker processes
+loading the same index share one copy through the OS page cache instead of
+each holding their own, and loading costs a few file opens.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import faiss
+import numpy as np
+
+FORMAT_VERSION = 2
+
+
+class IndexFormatError(Exception):
+    """Index files are missing, corrupt or built for another model"""
+
+
+class TextStore(Sequence):
+    """Read-only list of chunk texts backed by a memory-mapped file"""
+
+    def __init__(self, texts_file: Path, offsets_file: Path):
+        self.offsets = np.load(str(offsets_file), mmap_mode="r")
+        self._file = open(texts_file, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap can't map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._data[start:end].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+def paths(directory: Path, name: str) -> Dict[str, Path]:
+    return {
+        "index": directory / f"{name}.index",
+        "texts": directory / f"{name}.texts.bin",
+        "offsets": directory / f"{name}.offsets.npy",
+        "meta": directory / f"{name}.meta.json",
+        "manifest": directory / f"{name}.manifest.json",
+    }
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _metadata_columns(metadata: List[dict]) -> dict:
+    """[{...}, ...] -> {"count": n, "columns": {key: [values]}}"""
+    keys: List[str] = []
+    for item in metadata:
+        for key in item:
+            if key not in keys:
+                keys.append(key)
+    return {
+        "count": len(metadata),
+        "columns": {key: [item.get(key) for item in metadata] for key in keys},
+    }
+
+
+def _metadata_rows(meta: dict) -> List[dict]:
+    columns = meta["columns"]
+    return [
+        {key: values[i] for key, values in columns.items() if values[i] is not None}
+        for i in range(meta["count"])
+    ]
+
+
+def _atomic_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def write(directory: Path, name: str, index, texts: List[str], metadata: List[dict],
+          embedding_model: str, extra: Optional[dict] = None):
+    """
+    Write an index in format version 2.
+
+    Each file is written beside its target and renamed over it, so workers
+    that still have the old files mapped keep reading a consistent copy;
+    the manifest goes last.
+    """
+    files = paths(directory, name)
+
+    faiss.write_index(index, str(_atomic_path(files["index"])))
+
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(_atomic_path(files["texts"]), "wb") as f:
+        f.write(b"".join(encoded))
+    with open(_atomic_path(files["offsets"]), "wb") as f:
+        np.save(f, offsets)
+
+    with open(_atomic_path(files["meta"]), "w", encoding="utf-8") as f:
+        json.dump(_metadata_columns(metadata), f, separators=(",", ":"))
+
+    checksums = {}
+    for kind in ("index", "texts", "offsets", "meta"):
+        checksums[files[kind].name] = file_checksum(_atomic_path(files[kind]))
+        os.replace(_atomic_path(files[kind]), files[kind])
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "embedding_model": embedding_model,
+        "dimension": index.d,
+        "count": index.ntotal,
+        "index_type": type(index).__name__,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "checksums": checksums,
+    }
+    if extra:
+        manifest.update(extra)
+    with open(_atomic_path(files["manifest"]), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(_atomic_path(files["manifest"]), files["manifest"])
+
+
+def read_manifest(directory: Path, name: str) -> Optional[dict]:
+    manifest_file = paths(directory, name)["manifest"]
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read(directory: Path, name: str, embedding_model: Optional[str] = None,
+         dimension: Optional[int] = None, verify: bool = False):
+    """
+    Open an index written by `write`.
+
+    Returns (index, texts, metadata, manifest). Raises IndexFormatError when
+    the manifest doesn't match the expected model/dimension, or when
+    `verify` is set and a checksum is wrong.
+    """
+    files = paths(directory, name)
+    manifest = read_manifest(directory, name)
+    if manifest is None:
+        raise IndexFormatError(f"No manifest for index '{name}'")
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise IndexFormatError(f"Unsupported index format {manifest.get('format_version')}")
+    if embedding_model and manifest["embedding_model"] != embedding_model:
+        raise IndexFormatError(
+            f"Index built with {manifest['embedding_model']}, queries use {embedding_model}"
+        )
+    if dimension and manifest["dimension"] != dimension:
+        raise IndexFormatError(f"Index dimension {manifest['dimension']}, expected {dimension}")
+
+    if verify:
+        for filename, checksum in manifest["checksums"].items():
+            if file_checksum(directory / filename) != checksum:
+                raise IndexFormatError(f"Checksum mismatch for {filename}")
+
+    index = _read_faiss_mmap(files["index"])
+    texts = TextStore(files["texts"], files["offsets"])
+    with open(files["meta"], "r", encoding="utf-8") as f:
+        metadata = _metadata_rows(json.load(f))
+
+    if not (index.ntotal == len(texts) == len(metadata) == manifest["count"]):
+        raise IndexFormatError(f"Index '{name}' files disagree on the number of chunks")
+
+    return index, texts, metadata, manifest
+
+
+def _read_faiss_mmap(index_file: Path):
+    # IO_FLAG_MMAP_IFC (mmap flat codes) only exists in newer faiss releases
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    try:
+        return faiss.read_index(str(index_file), flags)
+    except RuntimeError:
+        # Index types without mmap support are read normally
+        return faiss.read_index(str(index_file))
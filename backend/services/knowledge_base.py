@@ -1,22 +1,35 @@
 from pathlib import Path
-from services.vector_store import VectorStore
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from services.vector_store import VectorStore, chunk_text
+from services.bm25 import BM25Index, reciprocal_rank_fusion
+from services.context_packer import PackedContext, pack, rank_sections
+from services.metrics import retrievals_total
+from config import settings
+
+# Chunking used by build_index.py, BM25 falls back to it when there's no index
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 50
 
 # Global vector store instance
 _vector_store = None
+_vector_store_loaded = False
 
 def get_vector_store() -> VectorStore:
     """Get or create vector store singleton"""
-    global _vector_store
+    global _vector_store, _vector_store_loaded
     
     if _vector_store is None:
         _vector_store = VectorStore()
         # Try to load existing index
-        if not _vector_store.load():
+        _vector_store_loaded = _vector_store.load()
+        if not _vector_store_loaded:
             print("⚠️  FAISS index not found. Run 'python build_index.py' first!")
             print("   Falling back to loading full knowledge base...")
-            return None
     
-    return _vector_store
+    # An index that failed to load stays empty, keep using the fallback
+    return _vector_store if _vector_store_loaded else None
 
 def load_knowledge_base() -> dict:
     """Load all knowledge base files"""
@@ -41,39 +54,139 @@ def load_knowledge_base() -> dict:
     
     return knowledge
 
-def get_relevant_knowledge(property_data, question: str, use_vector_search: bool = True) -> str:
+def knowledge_chunks() -> Tuple[List[str], List[dict]]:
+    """Knowledge files split into index chunks, with their metadata"""
+    texts, metadata = [], []
+    for source, content in load_knowledge_base().items():
+        chunks = chunk_text(content, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        texts.extend(chunks)
+        metadata.extend({"source": source, "chunk_id": i} for i in range(len(chunks)))
+    return texts, metadata
+
+# Global BM25 index over the same chunks
+_lexical_index = None
+
+def get_lexical_index() -> BM25Index:
+    """BM25 over the FAISS index's chunks (or freshly chunked knowledge files without one)"""
+    global _lexical_index
+    
+    if _lexical_index is None:
+        vector_store = get_vector_store()
+        if vector_store is not None:
+            _lexical_index = BM25Index(vector_store.texts, vector_store.metadata)
+        else:
+            _lexical_index = BM25Index(*knowledge_chunks())
+        print(f"✅ BM25 index built over {len(_lexical_index)} chunks")
+    
+    return _lexical_index
+
+def is_lexical_question(question: str) -> bool:
     """
-    Get relevant knowledge using vector search or fallback to full knowledge
+    True when BM25 alone can rank for this question: (nearly) all of its
+    words occur in the knowledge chunks, e.g. "what taxes and fees apply",
+    "strata title above the ground floor"
     """
-    if use_vector_search:
-        vector_store = get_vector_store()
-        
-        if vector_store:
-            # Build search query
-            search_query = f"""
-            Property type: {property_data.type}
-            Question: {question}
-            """
-            
-            # Search for relevant chunks
-            results = vector_store.search(search_query, k=3)
-            
-            # Combine relevant chunks
-            relevant_texts = [text for text, metadata, score in results]
-            return "\n\n".join(relevant_texts)
+    return get_lexical_index().coverage(question) >= settings.LEXICAL_MIN_COVERAGE
+
+# Question keywords that pull in a knowledge source regardless of property type.
+# Matched as whole words (plural "s"/"es" allowed), so "please" is not
+# "lease" and "island" is not "land"
+INTENT_KEYWORDS = {
+    "costs_fees": ("cost", "fee", "tax", "price", "pay", "paid", "payment", "stamp duty", "transfer",
+                   "expense", "budget"),
+    "condo_rules": ("condo", "strata", "apartment", "floor", "70%", "quota"),
+    "villa_leasehold": ("lease", "leasehold", "leasing", "villa", "land", "company", "companies",
+                        "nominee", "hard title", "soft title"),
+}
+_INTENT_PATTERNS = {
+    source: re.compile(
+        r"(?<![a-z0-9])(?:" + "|".join(re.escape(keyword) for keyword in keywords) + r")(?:e?s)?(?![a-z0-9])"
+    )
+    for source, keywords in INTENT_KEYWORDS.items()
+}
+# Listing attributes that contain a keyword but don't ask about its topic
+_NON_INTENT_PHRASES = re.compile(r"\b(?:floor (?:area|plan|space)|land size)\b")
+
+def question_intents(question: str) -> List[str]:
+    """Knowledge sources the question itself asks about (see INTENT_KEYWORDS)"""
+    question_lower = _NON_INTENT_PHRASES.sub(" ", question.lower())
+    return [source for source, pattern in _INTENT_PATTERNS.items() if pattern.search(question_lower)]
+
+def select_sources(property_data, question: str) -> List[str]:
+    """
+    Knowledge sources that apply to this property and question
     
-    # Fallback to old method
-    knowledge = load_knowledge_base()
-    relevant = []
+    - condos: condo rules
+    - anything with land (villas, houses, land, ground-floor condos): leasehold
+    - unknown property type: both ownership sources
+    - plus any source the question itself asks about (e.g. fees), by whole
+      keywords: "Can you please explain strata?" does not add leasehold
+    """
+    sources = []
+    if property_data.type == "condo":
+        sources.append("condo_rules")
+    if property_data.type in ("villa", "house", "land") or property_data.has_land:
+        sources.append("villa_leasehold")
+    if not sources:
+        sources.extend(["villa_leasehold", "condo_rules"])
+    
+    for source in question_intents(question):
+        if source not in sources:
+            sources.append(source)
+    
+    return sources
+
+async def get_relevant_knowledge(property_data, question: str, use_vector_search: bool = True,
+                                 question_embedding: Optional[np.ndarray] = None) -> str:
+    """
+    Get relevant knowledge using hybrid BM25 + vector search, BM25 alone,
+    or fallback to full knowledge
+    
+    The search embeds the question alone (the property type is applied as a
+    source filter), so a `question_embedding` computed before the listing
+    was parsed can be passed in and reused. Without vector search (lexical
+    fast path, failed embedding, no index) BM25 ranks the chunks on its own.
+    Either way the result is packed into settings.CONTEXT_TOKEN_BUDGET tokens.
+    """
+    sources = select_sources(property_data, question)
+    k = settings.CONTEXT_CANDIDATES
+    vector_store = get_vector_store() if use_vector_search else None
     
-    # Add property-specific knowledge
-    if property_data.type == "villa" or property_data.has_land:
-        relevant.append(knowledge.get("villa_leasehold", ""))
-    elif property_data.type == "condo":
-        relevant.append(knowledge.get("condo_rules", ""))
+    # Search for relevant chunks among the applicable sources only
+    if vector_store:
+        if question_embedding is None:
+            results = await vector_store.asearch(question, k=k, sources=sources)
+        else:
+            results = vector_store.search_by_vector(question_embedding, k=k, sources=sources)
+        path = "vector"
+        if settings.HYBRID_RETRIEVAL:
+            lexical = get_lexical_index().search(question, k=k, sources=sources)
+            results = reciprocal_rank_fusion([results, lexical], k, rrf_k=settings.RRF_K)
+            path = "hybrid"
+    else:
+        results = get_lexical_index().search(question, k=k, sources=sources)
+        path = "lexical"
     
-    # Add cost knowledge if question is about costs
-    if "cost" in question.lower() or "fee" in question.lower():
-        relevant.append(knowledge.get("costs_fees", ""))
+    if results:
+        # Best chunks first, overlapping seams removed
+        packed = pack([text for text, metadata, score in results], settings.CONTEXT_TOKEN_BUDGET)
+        _log_packed(path, packed)
+        retrievals_total.inc(path=path)
+        return packed.text
     
-    return "\n\n".join(relevant)
+    # Fallback: sections of the applicable knowledge files, most relevant first
+    knowledge = load_knowledge_base()
+    ranked = rank_sections([knowledge.get(source, "") for source in sources], question)
+    packed = pack(
+        [section for position, section in ranked],
+        settings.CONTEXT_TOKEN_BUDGET,
+        dedupe=False,
+        order=[position for position, section in ranked],
+    )
+    _log_packed("fallback", packed)
+    retrievals_total.inc(path="fallback")
+    return packed.text
+
+def _log_packed(path: str, packed: PackedContext):
+    print(f"📦 Packed {path} knowledge: {packed.passages_used}/{packed.passages_in} passages, "
+          f"~{packed.tokens} tokens ({packed.tokens_saved} saved)")
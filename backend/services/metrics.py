@@ -0,0 +1,292 @@
+"""
+Latency, token and cache metrics for the ask pipeline.
+
+Stages are timed with `span("fetch")` blocks (or StageTimer in
+services/pipeline.py) and land in one `stage_seconds` histogram labelled
+by stage. The registry renders everything in the Prometheus text format
+for /metrics; cache hit ratios are read from the caches' own stats() at
+scrape time. TimingMiddleware times every request and, when enabled,
+reports the spans recorded while handling it in a Server-Timing header.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+NAMESPACE = "explainer"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 1500, 2000, 3000, 4000, 8000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirror a count kept elsewhere (e.g. a cache's own hit counter)"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Current value per label set"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set (cumulative buckets, sum and count)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            snapshot = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus callbacks that refresh mirrored values before a scrape"""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(f"{self.namespace}_{name}", help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(f"{self.namespace}_{name}", help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(f"{self.namespace}_{name}", help, labels, buckets))
+
+    def on_collect(self, callback: Callable[[], None]):
+        self._collectors.append(callback)
+
+    def render(self) -> str:
+        for callback in self._collectors:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️  Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics the pipeline records
+metrics = MetricsRegistry(NAMESPACE)
+
+stage_seconds = metrics.histogram(
+    "stage_seconds", "Duration of ask pipeline stages (fetch, parse, embed, search, ...)", ("stage",)
+)
+request_seconds = metrics.histogram(
+    "request_seconds", "HTTP request duration including streamed bodies", ("endpoint", "status")
+)
+generation_ttft_seconds = metrics.histogram(
+    "generation_ttft_seconds", "Time from the OpenAI request to the first answer token"
+)
+generation_seconds = metrics.histogram(
+    "generation_seconds", "Time from the OpenAI request to the complete answer", ("mode",)
+)
+prompt_tokens = metrics.histogram(
+    "prompt_tokens", "Estimated prompt tokens per generation", buckets=TOKEN_BUCKETS
+)
+tokens_total = metrics.counter(
+    "tokens_total", "OpenAI tokens (prompt estimated, completion counted)", ("kind",)
+)
+retrievals_total = metrics.counter(
+    "retrievals_total", "Knowledge retrievals by path (hybrid, vector, lexical, fallback)", ("path",)
+)
+model_calls_total = metrics.counter(
+    "model_calls_total", "Chat completion calls by outcome (ok, retry, shed, circuit_open, failed)", ("outcome",)
+)
+model_queue_seconds = metrics.histogram(
+    "model_queue_seconds", "Time a chat completion waited for a slot and the rate limits", ("lane",)
+)
+fallback_answers_total = metrics.counter(
+    "fallback_answers_total", "Answers served without the model, by source (cache, rules)", ("source",)
+)
+cache_lookups_total = metrics.counter(
+    "cache_lookups_total", "Cache lookups by outcome", ("cache", "result")
+)
+cache_hit_ratio = metrics.gauge("cache_hit_ratio", "Cache hits / lookups since start", ("cache",))
+
+
+def watch_cache(name: str, stats: Callable[[], dict]):
+    """
+    Export a cache's stats() counters at scrape time.
+
+    Every "...hits" key (hits, stale_hits, memory_hits, disk_hits) and
+    "coalesced" counts as a hit, "misses" as a miss.
+    """
+    def collect():
+        values = stats()
+        hits = sum(v for k, v in values.items() if k.endswith("hits")) + values.get("coalesced", 0)
+        misses = values.get("misses", 0)
+        cache_lookups_total.set_total(hits, cache=name, result="hit")
+        cache_lookups_total.set_total(misses, cache=name, result="miss")
+        cache_hit_ratio.set(hits / (hits + misses) if hits + misses else 0.0, cache=name)
+    metrics.on_collect(collect)
+
+
+# Stage durations (ms) of the request being handled, for Server-Timing.
+# Tasks started while handling it copy the context and share the dict.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings: Dict[str, float], total_ms: float) -> str:
+    entries = [f"{stage};dur={ms:.1f}" for stage, ms in timings.items()]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware timing each request into `request_seconds`.
+
+    With `server_timing` the stages recorded before the response starts are
+    sent in a Server-Timing header; for streamed answers that covers the
+    preparation stages, generation happens after the headers are sent.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing_header(timings, total_ms))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # The router stores the matched endpoint in the scope; label by its
+            # name so paths with parameters don't explode the series count
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            request_seconds.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
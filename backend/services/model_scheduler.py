@@ -0,0 +1,387 @@
+"""
+Admission control for chat completion calls.
+
+Every OpenAI generation goes through `model_scheduler`:
+
+- a bounded number of calls in flight, the rest wait in a queue that is
+  served round-robin across lanes ("interactive" requests vs "batch"
+  runs), FIFO within a lane
+- waiting is bounded by a deadline: calls that would wait longer (queue
+  full, slot or rate limit not available in time) are shed right away
+- token buckets for the account's requests/minute and tokens/minute quota
+- retries with full-jitter exponential backoff for rate limits, timeouts,
+  connection errors and 5xx, honouring Retry-After
+- a circuit breaker that fails calls fast after repeated upstream failures
+  and lets a single trial call through after a cool-down
+
+Calls that can't be served raise ModelUnavailable; callers answer from
+services/fallback.py instead.
+"""
+
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, TypeVar
+
+import openai
+from config import settings
+from services.metrics import metrics, model_calls_total, model_queue_seconds
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class ModelUnavailable(Exception):
+    """No model answer for this call: shed, circuit open or retries exhausted"""
+
+
+class Overloaded(ModelUnavailable):
+    """Shed before reaching the model (queue full, deadline, rate limit)"""
+
+
+class CircuitOpen(ModelUnavailable):
+    """Failing fast while the upstream is considered down"""
+
+
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on an API error, if any"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 per second up to `capacity` (default: one
+    minute's quota). A rate of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` is available"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float):
+        """Reserve `amount` now; the level may go negative and is paid back by waiting"""
+        if self.rate:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures,
+    open -> half_open after `reset_timeout`, half_open -> closed on a success"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            # One trial call at a time
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+        return self.state == "closed"
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+                print(f"⚠️  Model circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """A trial call that ended without a verdict (shed, cancelled, non-retryable error)"""
+        self._trial_running = False
+
+
+class FairQueue:
+    """At most `max_in_flight` holders; waiters served round-robin across lanes"""
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._lanes: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._lanes.values())
+
+    async def acquire(self, lane: str, timeout: float):
+        if self.in_flight < self.max_in_flight and not self._lanes:
+            self.in_flight += 1
+            return
+        if self.waiting >= self.max_queue:
+            raise Overloaded("model queue full")
+        if timeout <= 0:
+            raise Overloaded("no model slot before the deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        self._lanes.setdefault(lane, deque()).append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._discard(lane, future)
+            raise Overloaded("no model slot before the deadline") from None
+        except asyncio.CancelledError:
+            self._discard(lane, future)
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _discard(self, lane: str, future: asyncio.Future):
+        waiters = self._lanes.get(lane)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self._lanes[lane]
+
+    def release(self):
+        self.in_flight -= 1
+        while self.in_flight < self.max_in_flight and self._lanes:
+            # Next lane in turn, then to the back of the rotation
+            lane, waiters = next(iter(self._lanes.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._lanes.move_to_end(lane)
+            else:
+                del self._lanes[lane]
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+
+class ModelScheduler:
+    """Queue, rate limits, retries and circuit breaker around model calls"""
+
+    def __init__(self, max_in_flight: int = 16, max_queue: int = 200, queue_timeout: float = 10.0,
+                 deadline: float = 60.0, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_retries: int = 3, retry_base: float = 0.5, retry_max: float = 8.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.queue = FairQueue(max_in_flight, max_queue)
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.retries = 0
+        self.shed = 0
+        self.failed = 0
+
+    @asynccontextmanager
+    async def _admitted(self, lane: str, tokens: int, deadline: float):
+        """
+        Hold a slot with the rate limits paid, or raise Overloaded. A call
+        that never gets admitted (shed or cancelled while waiting) hands a
+        half-open circuit's trial back, so the next call can take it.
+        """
+        start = time.monotonic()
+        try:
+            await self.queue.acquire(lane, min(self.queue_timeout, deadline - start))
+        except BaseException as e:
+            self.breaker.release_trial()
+            if isinstance(e, Overloaded):
+                self.shed += 1
+                model_calls_total.inc(outcome="shed")
+            raise
+        try:
+            try:
+                wait = max(self.requests.delay(1), self.tokens.delay(tokens))
+                if time.monotonic() + wait > min(start + self.queue_timeout, deadline):
+                    self.shed += 1
+                    model_calls_total.inc(outcome="shed")
+                    raise Overloaded(f"rate limited for {wait:.1f}s")
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                if wait:
+                    await asyncio.sleep(wait)
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            model_queue_seconds.observe(time.monotonic() - start, lane=lane)
+            yield
+        finally:
+            self.queue.release()
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            model_calls_total.inc(outcome="circuit_open")
+            raise CircuitOpen("model circuit open")
+
+    async def _backoff(self, attempt: int, error: Exception, deadline: float):
+        """Sleep before retry `attempt` (1-based) or raise when out of retries/time"""
+        if attempt > self.max_retries:
+            self.failed += 1
+            model_calls_total.inc(outcome="failed")
+            raise ModelUnavailable(f"model call failed after {attempt} attempts: {error}") from error
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (attempt - 1)))
+        delay = max(delay, min(retry_after(error) or 0.0, self.retry_max))
+        if time.monotonic() + delay > deadline:
+            self.failed += 1
+            model_calls_total.inc(outcome="failed")
+            raise ModelUnavailable(f"model call failed, no time left to retry: {error}") from error
+        self.retries += 1
+        model_calls_total.inc(outcome="retry")
+        print(f"⚠️  Model call failed ({type(error).__name__}), retry {attempt} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def call(self, request: Callable[[], Awaitable[T]], lane: str = "interactive", tokens: int = 0) -> T:
+        """Run `request()` (a single API call) under admission control, with retries"""
+        deadline = time.monotonic() + self.deadline
+        self.calls += 1
+        attempt = 0
+        while True:
+            self._check_circuit()
+            async with self._admitted(lane, tokens, deadline):
+                try:
+                    result = await request()
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.breaker.release_trial()
+                        raise
+                    self.breaker.record_failure()
+                    error = e
+                except BaseException:
+                    self.breaker.release_trial()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    model_calls_total.inc(outcome="ok")
+                    return result
+            attempt += 1
+            await self._backoff(attempt, error, deadline)
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]], lane: str = "interactive",
+                     tokens: int = 0) -> AsyncIterator[T]:
+        """
+        Iterate `open_stream()` under admission control; the slot is held for
+        the whole stream. Failures before the first item are retried, later
+        ones are raised to the reader.
+        """
+        deadline = time.monotonic() + self.deadline
+        self.calls += 1
+        attempt = 0
+        while True:
+            self._check_circuit()
+            async with self._admitted(lane, tokens, deadline):
+                items = open_stream()
+                started = False
+                try:
+                    async for item in items:
+                        if not started:
+                            started = True
+                            self.breaker.record_success()
+                        yield item
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.breaker.release_trial()
+                        raise
+                    self.breaker.record_failure()
+                    if started:
+                        raise
+                    error = e
+                except BaseException:
+                    self.breaker.release_trial()
+                    raise
+                else:
+                    if not started:
+                        self.breaker.record_success()
+                    model_calls_total.inc(outcome="ok")
+                    return
+                finally:
+                    await items.aclose()
+            attempt += 1
+            await self._backoff(attempt, error, deadline)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.queue.in_flight,
+            "waiting": self.queue.waiting,
+            "max_in_flight": self.queue.max_in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "shed": self.shed,
+            "failed": self.failed,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+        }
+
+
+# Global scheduler for chat completions
+model_scheduler = ModelScheduler(
+    max_in_flight=settings.MODEL_MAX_IN_FLIGHT,
+    max_queue=settings.MODEL_MAX_QUEUE,
+    queue_timeout=settings.MODEL_QUEUE_TIMEOUT,
+    deadline=settings.MODEL_DEADLINE,
+    requests_per_minute=settings.OPENAI_RPM,
+    tokens_per_minute=settings.OPENAI_TPM,
+    max_retries=settings.MODEL_MAX_RETRIES,
+    retry_base=settings.MODEL_RETRY_BASE,
+    retry_max=settings.MODEL_RETRY_MAX,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+)
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+_in_flight = metrics.gauge("model_in_flight", "Chat completions in flight")
+_waiting = metrics.gauge("model_waiting", "Chat completions waiting for a slot")
+_circuit = metrics.gauge("model_circuit_state", "Model circuit breaker (0 closed, 1 half open, 2 open)")
+
+
+def _collect():
+    _in_flight.set(model_scheduler.queue.in_flight)
+    _waiting.set(model_scheduler.queue.waiting)
+    _circuit.set(_CIRCUIT_STATES[model_scheduler.breaker.state])
+
+metrics.on_collect(_collect)
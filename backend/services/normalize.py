@@ -0,0 +1,154 @@
+"""
+Price and area normalisation for listing text.
+
+Every pattern is compiled once at import. Scalar functions handle one raw
+string; the `normalize_*` column functions take a whole array of raw
+strings (reparse.py, imported sheets) and parse each distinct value
+once, converting the plain numeric ones with a single NumPy cast.
+"""
+
+import re
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from config import settings
+
+SQFT_TO_SQM = 0.09290304
+HECTARE_TO_SQM = 10000.0
+
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6}
+
+_NUMBER = r"\d{1,3}(?:[,\s]\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+_SCALE = r"(?:\s*(?P<{name}>k|thousand|mn|million|m)\b)?"
+
+# "$575,000", "US$ 1.2M", "USD 98,500", "575K", "410,000,000 KHR", "៛ 4.1 million"
+PRICE_PATTERN = re.compile(
+    rf"(?P<pre>us\$|usd|\$|khr|riels?|៛)?\s*(?P<amount>{_NUMBER}){_SCALE.format(name='scale')}"
+    rf"(?:\s*(?P<post>usd|khr|riels?|៛|\$))?",
+    re.IGNORECASE,
+)
+# "$120,000 - $150,000", "120k to 150k"
+RANGE_SEPARATOR = re.compile(r"\s*(?:-|–|—|to)\s*", re.IGNORECASE)
+
+# "86 m²", "1,200 sqft", "0.5 ha", "300 square meters"
+AREA_PATTERN = re.compile(
+    rf"(?P<amount>{_NUMBER})\s*(?P<unit>"
+    r"sq\.?\s*m\b|sqm|m²|m2|square\s+met(?:er|re)s?|"
+    r"sq\.?\s*ft\b|sqft|ft²|ft2|square\s+f(?:ee|oo)t|"
+    r"ha\b|hectares?|m\b)",
+    re.IGNORECASE,
+)
+# Same grouping rule as _NUMBER, so the fast path agrees with parse_price
+_PLAIN_NUMBER = re.compile(r"^\s*\$?\s*(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s*$")
+
+
+def to_number(text: str) -> float:
+    """'1,234.5' / '1 234' -> 1234.5"""
+    return float(re.sub(r"[,\s]", "", text))
+
+
+def _is_khr(match: re.Match) -> bool:
+    currency = (match.group("pre") or match.group("post") or "").lower()
+    return currency.startswith(("khr", "riel", "៛"))
+
+
+def _price_value(match: re.Match, khr_per_usd: float) -> float:
+    value = to_number(match.group("amount"))
+    scale = match.group("scale")
+    if scale:
+        value *= _MULTIPLIERS[scale.lower()]
+    if _is_khr(match):
+        value /= khr_per_usd
+    return value
+
+
+def parse_price_range(text: str, khr_per_usd: Optional[float] = None) -> Optional[Tuple[float, float]]:
+    """
+    (low, high) in USD from a price string; both equal for a single price.
+
+    A currency or scale written only once applies to both ends of a range,
+    so "$120-150K" is (120000, 150000), unless the low end is already a
+    full figure: "$120,000 - $150K" is (120000, 150000) too.
+    """
+    if not text:
+        return None
+    khr_per_usd = khr_per_usd or settings.KHR_PER_USD
+    first = PRICE_PATTERN.search(text)
+    if first is None:
+        return None
+    low = _price_value(first, khr_per_usd)
+
+    separator = RANGE_SEPARATOR.match(text, first.end())
+    second = PRICE_PATTERN.match(text, separator.end()) if separator else None
+    if second is None:
+        return low, low
+
+    high = _price_value(second, khr_per_usd)
+    if not first.group("scale") and second.group("scale"):
+        multiplier = _MULTIPLIERS[second.group("scale").lower()]
+        grouped = re.search(r"\d[,\s]\d{3}", first.group("amount"))
+        if not grouped and low < multiplier:
+            low *= multiplier
+    if _is_khr(second) and not (first.group("pre") or first.group("post")):
+        low /= khr_per_usd
+    return (low, high) if low <= high else (high, low)
+
+
+def parse_price(text: str, khr_per_usd: Optional[float] = None) -> Optional[float]:
+    """Price in USD; the low end for ranges"""
+    price = parse_price_range(text, khr_per_usd)
+    return price[0] if price else None
+
+
+def _unit_factor(unit: str) -> float:
+    unit = unit.lower()
+    if "f" in unit:
+        return SQFT_TO_SQM
+    if unit.startswith("h"):
+        return HECTARE_TO_SQM
+    return 1.0
+
+
+def parse_area(text: str) -> Optional[float]:
+    """Area in square metres from '86 m²', '1,200 sqft', '0.5 ha' ..."""
+    if not text:
+        return None
+    match = AREA_PATTERN.search(text)
+    if match is None:
+        return None
+    return to_number(match.group("amount")) * _unit_factor(match.group("unit"))
+
+
+def _normalize_column(values: Sequence[str], parse, fast_path: bool) -> np.ndarray:
+    raw = np.asarray(values, dtype=str)
+    if raw.size == 0:
+        return np.empty(0, dtype=np.float64)
+
+    # Listings repeat the same strings a lot: parse each distinct one once
+    unique, inverse = np.unique(raw, return_inverse=True)
+    parsed = np.full(unique.shape, np.nan)
+
+    todo = np.ones(unique.shape, dtype=bool)
+    if fast_path:
+        # Plain "$575,000" / "98500": strip and cast the whole column at once
+        plain = np.fromiter((bool(_PLAIN_NUMBER.match(v)) for v in unique), dtype=bool, count=unique.size)
+        if plain.any():
+            cleaned = np.char.replace(np.char.replace(np.char.strip(unique[plain]), "$", ""), ",", "")
+            parsed[plain] = np.char.strip(cleaned).astype(np.float64)
+            todo &= ~plain
+
+    for i in np.flatnonzero(todo):
+        value = parse(unique[i])
+        if value is not None:
+            parsed[i] = value
+    return parsed[inverse.reshape(raw.shape)]
+
+
+def normalize_prices(values: Sequence[str]) -> np.ndarray:
+    """USD prices for a column of raw price strings (NaN where unparseable)"""
+    return _normalize_column(values, parse_price, fast_path=True)
+
+
+def normalize_areas(values: Sequence[str]) -> np.ndarray:
+    """Square metres for a column of raw area strings (NaN where unparseable)"""
+    return _normalize_column(values, parse_area, fast_path=False)
@@ -1,70 +1,103 @@
+import time
 from openai import AsyncOpenAI
 from config import settings
-from pathlib import Path
+from services.prompts import prompts, estimate_tokens
+from services.metrics import generation_seconds, generation_ttft_seconds, prompt_tokens, tokens_total
+from services.model_scheduler import model_scheduler
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+# Retries, rate limits and the circuit breaker live in model_scheduler
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None, max_retries=0)
+
+MAX_TOKENS = 800
+
+SYSTEM_PROMPT = "system_prompt"
+QUESTION_PROMPT = "property_question"
 
 def load_system_prompt() -> str:
-    """Load system prompt from file"""
-    prompt_file = Path(__file__).parent.parent / "prompts" / "system_prompt.txt"
-    with open(prompt_file, 'r', encoding='utf-8') as f:
-        return f.read()
+    """System prompt text (cached, reloaded when the file changes)"""
+    template = prompts.get(SYSTEM_PROMPT)
+    template.refresh()
+    return template.text
 
 def build_prompt(property_data, knowledge: str, question: str) -> str:
     """
     Build a prompt for OpenAI based on property data and question
+    
+    The law text comes first and the question last, so requests about the
+    same kind of property share the longest possible prompt prefix.
     """
-    prompt = f"""
-Property Details:
-- Type: {property_data.type}
-- Price: ${property_data.price_usd:,.0f} USD
-- Bedrooms: {property_data.bedrooms}
-- Bathrooms: {property_data.bathrooms}
-- Floor Area: {property_data.size_sqm} m²
-- Land Size: {property_data.land_size_sqm} m² (if applicable)
-- Ownership Type: {property_data.ownership_type}
-- Location: {property_data.location}
-- Floor Level: {property_data.floor_level if property_data.floor_level else 'N/A (not a condo)'}
-
-Eligibility for Foreigners:
-- Can own directly: {"Yes" if property_data.is_foreign_eligible_direct else "No"}
-- Has land: {"Yes" if property_data.has_land else "No"}
-- Recommended structures: {", ".join(property_data.recommended_structures) if property_data.recommended_structures else "None"}
-
-Relevant Cambodia Property Law Information:
-{knowledge}
+    return prompts.get(QUESTION_PROMPT).render(
+        knowledge=knowledge,
+        type=property_data.type,
+        price_usd=property_data.price_usd,
+        bedrooms=property_data.bedrooms,
+        bathrooms=property_data.bathrooms,
+        size_sqm=property_data.size_sqm,
+        land_size_sqm=property_data.land_size_sqm,
+        ownership_type=property_data.ownership_type,
+        location=property_data.location,
+        floor_level=property_data.floor_level if property_data.floor_level else 'N/A (not a condo)',
+        can_own_directly="Yes" if property_data.is_foreign_eligible_direct else "No",
+        has_land="Yes" if property_data.has_land else "No",
+        recommended_structures=", ".join(property_data.recommended_structures) if property_data.recommended_structures else "None",
+        question=question,
+    )
 
-User Question: {question}
+def build_messages(property_data, knowledge: str, question: str, system_prompt: str = None) -> list:
+    """
+    Chat messages in a stable order: static system prompt, then the user
+    prompt (law text, property, question). Logs and records estimated
+    token counts.
+    """
+    return _build_messages(property_data, knowledge, question, system_prompt)[0]
 
-Please answer the user's question about THIS SPECIFIC property. Use the property details and legal information provided above. Remember to:
-- Be positive and focus on possibilities
-- Use simple language
-- Mention this is common for foreigners
-- Suggest consulting a lawyer
-- Keep it under 350 words
-"""
+def _build_messages(property_data, knowledge: str, question: str, system_prompt: str = None):
+    """(messages, estimated prompt tokens)"""
+    system_prompt = system_prompt or load_system_prompt()
+    user_prompt = build_prompt(property_data, knowledge, question)
+    
+    system_tokens = estimate_tokens(system_prompt)
+    knowledge_tokens = estimate_tokens(knowledge)
+    total_tokens = system_tokens + estimate_tokens(user_prompt)
+    versions = prompts.versions()
+    print(f"🧮 Prompt {SYSTEM_PROMPT}@{versions.get(SYSTEM_PROMPT)} + {QUESTION_PROMPT}@{versions.get(QUESTION_PROMPT)}: "
+          f"~{total_tokens} tokens (system {system_tokens}, knowledge {knowledge_tokens}, "
+          f"property + question {total_tokens - system_tokens - knowledge_tokens})")
+    prompt_tokens.observe(total_tokens)
+    tokens_total.inc(total_tokens, kind="prompt")
     
-    return prompt
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ], total_tokens
 
-async def call_openai(property_data, knowledge: str, question: str) -> str:
+async def call_openai(property_data, knowledge: str, question: str, system_prompt: str = None,
+                      lane: str = "interactive") -> str:
     """
     Call OpenAI API to generate answer (non-streaming)
+    
+    Goes through model_scheduler; raises ModelUnavailable when the call is
+    shed, the circuit is open or retries run out.
     """
     try:
-        system_prompt = load_system_prompt()
-        user_prompt = build_prompt(property_data, knowledge, question)
+        messages, estimated_tokens = _build_messages(property_data, knowledge, question, system_prompt)
         
-        response = await client.chat.completions.create(
-            model=settings.MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,  # Low temperature for consistent, predictable answers
-            max_tokens=800
+        started = time.perf_counter()
+        response = await model_scheduler.call(
+            lambda: client.chat.completions.create(
+                model=settings.MODEL,
+                messages=messages,
+                temperature=0.3,  # Low temperature for consistent, predictable answers
+                max_tokens=MAX_TOKENS
+            ),
+            lane=lane,
+            tokens=estimated_tokens + MAX_TOKENS,
         )
+        generation_seconds.observe(time.perf_counter() - started, mode="blocking")
         
         answer = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        tokens_total.inc(usage.completion_tokens if usage else estimate_tokens(answer), kind="completion")
         
         return answer
         
@@ -72,28 +105,48 @@ async def call_openai(property_data, knowledge: str, question: str) -> str:
         print(f"OpenAI API error: {e}")
         raise
 
-async def stream_openai_response(property_data, knowledge: str, question: str):
+async def _open_stream(messages: list):
+    """Content deltas of one streamed completion"""
+    stream = await client.chat.completions.create(
+        model=settings.MODEL,
+        messages=messages,
+        temperature=0.3,
+        max_tokens=MAX_TOKENS,
+        stream=True  # Enable streaming
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Stop generation upstream when the reader goes away early
+        await stream.response.aclose()
+
+async def stream_openai_response(property_data, knowledge: str, question: str, system_prompt: str = None,
+                                 lane: str = "interactive"):
     """
     Stream OpenAI response word by word
+    
+    Goes through model_scheduler (failures before the first token are
+    retried); raises ModelUnavailable when no stream could be started.
     """
     try:
-        system_prompt = load_system_prompt()
-        user_prompt = build_prompt(property_data, knowledge, question)
+        messages, estimated_tokens = _build_messages(property_data, knowledge, question, system_prompt)
         
-        stream = await client.chat.completions.create(
-            model=settings.MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=800,
-            stream=True  # Enable streaming
-        )
-        
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        started = time.perf_counter()
+        deltas = 0
+        try:
+            async for delta in model_scheduler.stream(
+                lambda: _open_stream(messages), lane=lane, tokens=estimated_tokens + MAX_TOKENS
+            ):
+                if deltas == 0:
+                    generation_ttft_seconds.observe(time.perf_counter() - started)
+                # One delta per token on the chat completions stream
+                deltas += 1
+                yield delta
+            generation_seconds.observe(time.perf_counter() - started, mode="stream")
+        finally:
+            tokens_total.inc(deltas, kind="completion")
         
     except Exception as e:
         print(f"OpenAI streaming error: {e}")
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, Optional, TypeVar
+
+import numpy as np
+from models.property import PropertyData
+from services.answer_cache import lookup_answer
+from services.embeddings import aembed_query, cached_query_embedding
+from services.knowledge_base import get_relevant_knowledge, get_vector_store, is_lexical_question
+from services.metrics import record_stage
+from services.openai_service import load_system_prompt
+from services.property_cache import get_property
+from config import settings
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Wall-clock milliseconds per pipeline stage (also recorded as metrics)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = seconds * 1000
+            record_stage(name, seconds)
+
+    def total(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> str:
+        stages = ", ".join(f"{name}={ms:.1f}ms" for name, ms in self.stages.items())
+        return f"{stages}; total={self.total():.1f}ms"
+
+
+@dataclass
+class PreparedAnswer:
+    """Everything needed to answer (or replay) a question"""
+    property_data: PropertyData
+    question: str
+    question_embedding: Optional[np.ndarray]
+    system_prompt: str
+    knowledge: Optional[str] = None
+    cached_answer: Optional[str] = None
+    timer: StageTimer = field(default_factory=StageTimer)
+    # Lexical fast path: the embedding computed while the answer is generated
+    embed_task: Optional["asyncio.Task[Optional[np.ndarray]]"] = None
+
+    async def answer_embedding(self) -> Optional[np.ndarray]:
+        """Embedding to store the answer under, waiting for the background embed if there is one"""
+        if self.question_embedding is None and self.embed_task is not None:
+            self.question_embedding = await self.embed_task
+        return self.question_embedding
+
+
+async def _load_prompt_and_index() -> str:
+    """System prompt plus the (memory-mapped) knowledge index, off the loop"""
+    def load():
+        get_vector_store()
+        return load_system_prompt()
+    return await asyncio.to_thread(load)
+
+
+async def _embed_question(question: str, lexical: bool) -> Optional[np.ndarray]:
+    try:
+        if lexical:
+            # BM25 can rank for this question: no embeddings call, but use a
+            # cached embedding when there is one (answer cache, hybrid search)
+            return await cached_query_embedding(question)
+        return await aembed_query(question)
+    except Exception as e:
+        # Retrieval falls back to the full knowledge files
+        print(f"Question embedding failed, using fallback knowledge: {e}")
+        return None
+
+
+async def prepare_answer(property_url: str, question: str) -> PreparedAnswer:
+    """
+    Run the independent stages of the ask pipeline concurrently.
+
+    The question embedding, the listing fetch + parse and the system prompt /
+    index loading don't depend on each other, so they start together; the
+    answer cache lookup and the vector search join on their results.
+    
+    Questions BM25 can rank on its own (see is_lexical_question) don't wait
+    for the embeddings call: the answer cache is checked on the question
+    text (and a cached embedding), and on a miss the embedding is computed
+    in the background while the answer is generated, so the answer is
+    stored for similar questions too (see answer_embedding).
+    """
+    timer = StageTimer()
+    # BM25 (and the FAISS index it reads its chunks from) is built at
+    # startup off the loop, so this check is a few dict lookups
+    lexical = settings.LEXICAL_FAST_PATH and is_lexical_question(question)
+    embed_task = asyncio.create_task(timer.run("embed", _embed_question(question, lexical)))
+    listing_task = asyncio.create_task(timer.run("listing", get_property(property_url)))
+    prompt_task = asyncio.create_task(timer.run("prompt", _load_prompt_and_index()))
+    tasks = (embed_task, listing_task, prompt_task)
+
+    try:
+        property_data, question_embedding, system_prompt = await asyncio.gather(
+            listing_task, embed_task, prompt_task
+        )
+    finally:
+        # Don't leave stages running if one of them failed
+        for task in tasks:
+            task.cancel()
+
+    prepared = PreparedAnswer(
+        property_data=property_data,
+        question=question,
+        question_embedding=question_embedding,
+        system_prompt=system_prompt,
+        timer=timer,
+    )
+
+    prepared.cached_answer = lookup_answer(property_data, question, question_embedding)
+
+    if prepared.cached_answer is None and question_embedding is None and lexical:
+        prepared.embed_task = asyncio.create_task(_embed_question(question, lexical=False))
+
+    if prepared.cached_answer is None:
+        prepared.knowledge = await timer.run("retrieval", get_relevant_knowledge(
+            property_data,
+            question,
+            use_vector_search=question_embedding is not None,
+            question_embedding=question_embedding,
+        ))
+
+    notes = [note for note, applies in (
+        ("lexical fast path", lexical and question_embedding is None),
+        ("answer cache hit", prepared.cached_answer is not None),
+    ) if applies]
+    print(f"⏱️  Prepared answer for {property_data.id}: {timer.summary()}"
+          f"{' (' + ', '.join(notes) + ')' if notes else ''}")
+    return prepared
@@ -0,0 +1,170 @@
+import asyncio
+import re
+from pathlib import Path
+from typing import Iterable, List, Set
+from xml.etree import ElementTree
+
+from services.http_client import fetch
+from services.property_cache import property_cache
+from services.property_parser import listing_key
+from services.property_store import load_property
+from config import settings
+
+_LOC = "{http://www.sitemaps.org/schemas/sitemap/0.9}loc"
+_SITEMAP_INDEX = "{http://www.sitemaps.org/schemas/sitemap/0.9}sitemapindex"
+
+
+async def read_sitemap(url: str, pattern: re.Pattern, depth: int = 1) -> List[str]:
+    """Listing URLs in a sitemap, following a sitemap index `depth` levels"""
+    response = await fetch(url)
+    response.raise_for_status()
+    root = ElementTree.fromstring(response.content)
+    locations = [loc.text.strip() for loc in root.iter(_LOC) if loc.text]
+
+    if root.tag == _SITEMAP_INDEX:
+        if depth <= 0:
+            return []
+        urls = []
+        for child in locations:
+            try:
+                urls.extend(await read_sitemap(child, pattern, depth - 1))
+            except Exception as e:
+                print(f"⚠️  Skipping sitemap {child}: {e}")
+        return urls
+
+    return [location for location in locations if pattern.search(location)]
+
+
+def read_url_file(path: Path) -> List[str]:
+    """One URL per line, blank lines and # comments ignored"""
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+class PrefetchWorker:
+    """
+    Background crawler that keeps the property store warm.
+
+    URLs come from `enqueue` (e.g. the /api/prefetch endpoint) and, every
+    `interval` seconds, from the configured sitemap and URL file. Each URL
+    goes through `load_property`, so listings already in the store are only
+    revalidated (a 304 when unchanged), and the result is put in the
+    in-memory property cache for interactive requests.
+
+    At most `max_queue` URLs wait at a time; the overflow is dropped and
+    counted (the sitemap and URL file are crawled again next interval).
+    """
+
+    def __init__(self, concurrency: int = 4, interval: float = 3600.0,
+                 sitemap_url: str = "", urls_file: str = "", url_pattern: str = r"-\d+/?$",
+                 max_queue: int = 10000):
+        self.concurrency = concurrency
+        self.interval = interval
+        self.sitemap_url = sitemap_url
+        self.urls_file = urls_file
+        self.url_pattern = re.compile(url_pattern)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.fetched = 0
+        self.errors = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        """Queue URLs not already waiting, dropping those past a full queue; returns how many were added"""
+        added = 0
+        for url in urls:
+            key = listing_key(url)
+            if key in self._queued:
+                continue
+            try:
+                self._queue.put_nowait(url)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                continue
+            self._queued.add(key)
+            added += 1
+        return added
+
+    async def seed(self):
+        """Queue every URL from the sitemap and the URL file"""
+        urls = []
+        if self.urls_file:
+            try:
+                urls.extend(read_url_file(Path(self.urls_file)))
+            except OSError as e:
+                print(f"⚠️  Cannot read prefetch URL file: {e}")
+        if self.sitemap_url:
+            try:
+                urls.extend(await read_sitemap(self.sitemap_url, self.url_pattern))
+            except Exception as e:
+                print(f"⚠️  Cannot read sitemap {self.sitemap_url}: {e}")
+        dropped = self.dropped
+        added = self.enqueue(urls)
+        if added:
+            print(f"🔨 Prefetch queued {added} listings")
+        if self.dropped > dropped:
+            print(f"⚠️  Prefetch queue full, dropped {self.dropped - dropped} listings")
+
+    async def _seed_loop(self):
+        while True:
+            await self.seed()
+            await asyncio.sleep(self.interval)
+
+    async def _worker(self):
+        while True:
+            url = await self._queue.get()
+            try:
+                data = await load_property(url)
+                property_cache.put(url, data)
+                self.fetched += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Prefetch failed for {url}: {e}")
+            finally:
+                self._queued.discard(listing_key(url))
+                self._queue.task_done()
+
+    def start(self):
+        """Start the workers on the running loop (FastAPI startup)"""
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.sitemap_url or self.urls_file:
+            self._tasks.append(asyncio.create_task(self._seed_loop()))
+        print(f"✅ Prefetch worker started ({self.concurrency} workers)")
+
+    async def stop(self):
+        """Cancel the workers (FastAPI shutdown)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """Wait until the queue is drained"""
+        await self._queue.join()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "fetched": self.fetched,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+
+# Global prefetch worker (started from main.py when PREFETCH_ENABLED)
+prefetch_worker = PrefetchWorker(
+    concurrency=settings.PREFETCH_CONCURRENCY,
+    interval=settings.PREFETCH_INTERVAL,
+    sitemap_url=settings.PREFETCH_SITEMAP_URL,
+    urls_file=settings.PREFETCH_URLS_FILE,
+    url_pattern=settings.PREFETCH_URL_PATTERN,
+    max_queue=settings.PREFETCH_MAX_QUEUE,
+)
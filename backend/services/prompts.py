@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional, token counts fall back to an estimate
+    tiktoken = None
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+
+class PromptTemplate:
+    """
+    A prompt file loaded once and compiled into literal/field parts.
+
+    `render` only joins pre-split literals with formatted values, and the file
+    is re-read (with a new `version`) when its mtime or size changes. The
+    stat check runs at most every `check_interval` seconds.
+    """
+
+    def __init__(self, path: Path, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._stat = None
+        self.text = ""
+        self.version = ""
+        self.fields: Tuple[str, ...] = ()
+        self._parts: List[Tuple[str, str, str]] = []
+        self._load()
+
+    def _load(self):
+        stat = self.path.stat()
+        text = self.path.read_text(encoding="utf-8")
+        parts = [
+            (literal, field_name, format_spec or "")
+            for literal, field_name, format_spec, _ in Formatter().parse(text)
+        ]
+        self.text = text
+        self._parts = parts
+        self.fields = tuple(name for _, name, _ in parts if name)
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if the file changed on disk; True when a new version was loaded"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            stat = self.path.stat()
+            if not force and (stat.st_mtime_ns, stat.st_size) == self._stat:
+                return False
+            previous = self.version
+            self._load()
+        if self.version != previous:
+            print(f"♻️  Reloaded prompt {self.path.name} (version {self.version})")
+            return True
+        return False
+
+    def render(self, **values) -> str:
+        self.refresh()
+        out = []
+        for literal, name, spec in self._parts:
+            out.append(literal)
+            if name:
+                value = values[name]
+                # Missing numbers print like the other unknown fields
+                out.append(format(value, spec) if value is not None or not spec else "N/A")
+        return "".join(out)
+
+
+class PromptRegistry:
+    """Named templates from the prompts directory, loaded on first use"""
+
+    def __init__(self, directory: Path = PROMPTS_DIR):
+        self.directory = Path(directory)
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = PromptTemplate(self.directory / f"{name}.txt")
+                    self._templates[name] = template
+                    print(f"✅ Loaded prompt {name} (version {template.version})")
+        return template
+
+    def load(self, *names: str):
+        """Load templates up front, e.g. at startup"""
+        for name in names:
+            self.get(name)
+
+    def versions(self) -> Dict[str, str]:
+        return {name: template.version for name, template in self._templates.items()}
+
+
+# Global prompt registry
+prompts = PromptRegistry()
+
+_encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else ~4 characters per token"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
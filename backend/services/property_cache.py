@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+from models.property import PropertyData
+from services.property_parser import get_fallback_property_data, listing_key
+from services.property_store import load_property
+
+
+class _Entry:
+    """Cached listing plus the time it was fetched"""
+    __slots__ = ("data", "fetched_at")
+
+    def __init__(self, data: PropertyData, fetched_at: float):
+        self.data = data
+        self.fetched_at = fetched_at
+
+
+class PropertyCache:
+    """
+    In-memory LRU cache of parsed listings keyed by listing ID.
+
+    - Entries younger than `ttl` are served directly (hit).
+    - Entries older than `ttl` but younger than `ttl + stale_ttl` are served
+      immediately while a background refresh runs (stale hit).
+    - Concurrent misses for the same listing share one fetch (single-flight).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[PropertyData]],
+        max_size: int = 512,
+        ttl: float = 600.0,
+        stale_ttl: float = 3600.0,
+    ):
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """Cache key: listing ID when the URL has one, otherwise the URL"""
+        return listing_key(url)
+
+    async def get(self, url: str) -> PropertyData:
+        """Return listing data for url, fetching it at most once per key"""
+        key = self.key_for(url)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            age = now - entry.fetched_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.data
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_fetch(key, url)
+                return entry.data
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            self._start_fetch(key, url)
+
+        try:
+            # shield() so one cancelled request doesn't cancel the shared fetch
+            return await asyncio.shield(self._inflight[key])
+        except Exception as e:
+            print(f"Error parsing property: {e}")
+            return get_fallback_property_data(url)
+
+    def _start_fetch(self, key: str, url: str):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        task = asyncio.create_task(self._fetch(key, url, future))
+        # Keep a strong reference until the fetch finishes
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, key: str, url: str, future: asyncio.Future):
+        try:
+            data = await self.loader(url)
+        except Exception as e:
+            self.errors += 1
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so stale-only refreshes don't log warnings
+                future.exception()
+        else:
+            self._store(key, data)
+            if not future.done():
+                future.set_result(data)
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: str, data: PropertyData):
+        self._entries[key] = _Entry(data, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, url: str, data: PropertyData):
+        """Insert freshly loaded listing data (e.g. from the prefetch worker)"""
+        self._store(self.key_for(url), data)
+
+    def invalidate(self, url: Optional[str] = None):
+        """Drop one listing, or everything when url is None"""
+        if url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self.key_for(url), None)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for sizing the cache"""
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+            "hit_ratio": (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+# Global property cache instance
+property_cache = PropertyCache(
+    loader=load_property,  # persistent store first, conditional refetch
+    max_size=settings.PROPERTY_CACHE_SIZE,
+    ttl=settings.PROPERTY_CACHE_TTL,
+    stale_ttl=settings.PROPERTY_CACHE_STALE_TTL,
+)
+
+
+async def get_property(url: str) -> PropertyData:
+    """Get listing data through the shared property cache"""
+    return await property_cache.get(url)
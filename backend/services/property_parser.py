@@ -1,70 +1,128 @@
-import httpx
 from bs4 import BeautifulSoup
+import asyncio
 import re
-from typing import Optional, Tuple
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
 from models.property import PropertyData
+from config import settings
+from services.http_client import fetch
+from services.extraction import ExtractionEngine, ListingPage
+from services.html_backend import parse_document
+from services.html_archive import html_archive
+from services.normalize import PRICE_PATTERN, parse_area, parse_price
+from services.metrics import span
+
+# Extraction engine: page text is materialised once per listing and every
+# extractor works on it (see services/extraction.py)
+engine = ExtractionEngine()
+
+# Parsing is CPU-bound, keep it off the event loop
+_parse_executor = ThreadPoolExecutor(
+    max_workers=settings.PARSE_WORKERS,
+    thread_name_prefix="listing-parse",
+)
 
 async def parse_property_from_url(url: str) -> PropertyData:
     """
     Parse property data from realestate.com.kh listing page
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract property ID from URL
-        property_id = extract_id_from_url(url)
-        
-        # Extract property type
-        property_type = extract_property_type(soup, url)
-        
-        # Extract price
-        price = extract_price(soup)
-        
-        # Extract bedrooms/bathrooms
-        bedrooms = extract_bedrooms(soup)
-        bathrooms = extract_bathrooms(soup)
-        
-        # Extract sizes
-        size_sqm, land_size_sqm = extract_sizes(soup)
-        
-        # Extract ownership type
-        ownership_type = extract_ownership_type(soup)
-        
-        # Extract floor level (for condos)
-        floor_level = extract_floor_level(soup, property_type)
-        
-        # Extract location
-        location = extract_location(soup)
-        
-        # Create property data
-        property_data = PropertyData(
-            id=property_id,
-            url=url,
-            type=property_type,
-            price_usd=price,
-            bedrooms=bedrooms,
-            bathrooms=bathrooms,
-            size_sqm=size_sqm,
-            land_size_sqm=land_size_sqm,
-            ownership_type=ownership_type,
-            floor_level=floor_level,
-            location=location
-        )
-        
-        # Compute eligibility
-        property_data.compute_eligibility()
-        
-        return property_data
+        return await fetch_property(url)
         
     except Exception as e:
         print(f"Error parsing property: {e}")
         # Return basic data from URL
         return get_fallback_property_data(url)
 
+async def fetch_property(url: str) -> PropertyData:
+    """
+    Fetch and parse a listing, raising on any network or parse error
+    """
+    return (await fetch_listing(url)).data
+
+@dataclass
+class ListingFetch:
+    """Result of a (conditional) listing fetch"""
+    data: Optional[PropertyData]  # None when the page was not modified
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    
+    @property
+    def not_modified(self) -> bool:
+        return self.data is None
+
+async def fetch_listing(url: str, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None) -> ListingFetch:
+    """
+    Fetch and parse a listing, revalidating with the given validators
+    
+    A 304 Not Modified skips the download and the parse and returns no data;
+    callers keep what they already have.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    
+    with span("fetch"):
+        response = await fetch(url, headers=headers)
+    if response.status_code == 304 and headers:
+        return ListingFetch(None, etag, last_modified)
+    response.raise_for_status()
+    
+    loop = asyncio.get_running_loop()
+    with span("parse"):
+        data = await loop.run_in_executor(_parse_executor, _parse_and_archive, response.text, url)
+    return ListingFetch(
+        data,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
+
+def _parse_and_archive(html: str, url: str) -> PropertyData:
+    """Parse a fetched page and keep its raw HTML for offline re-parsing"""
+    if settings.HTML_ARCHIVE_ENABLED:
+        try:
+            html_archive.put(listing_key(url), url, html)
+        except (OSError, sqlite3.Error) as e:
+            # Best effort: a full disk or a locked archive never fails the parse
+            print(f"⚠️  Could not archive {url}: {e}")
+    return parse_listing_html(html, url)
+
+def parse_listing_html(html: str, url: str, backend: Optional[str] = None) -> PropertyData:
+    """Parse listing HTML into PropertyData with every registered extractor"""
+    return _parse_listing(html, url, backend)[0]
+
+def parse_listing_raw(html: str, url: str,
+                      backend: Optional[str] = None) -> Tuple[PropertyData, Dict[str, Optional[str]]]:
+    """
+    Like parse_listing_html, but price and sizes are left unset and their
+    raw strings returned instead, for normalising whole columns at once
+    (services/normalize.py). Eligibility doesn't depend on them.
+    """
+    return _parse_listing(html, url, backend, normalize=False)
+
+def _parse_listing(html: str, url: str, backend: Optional[str] = None,
+                   normalize: bool = True) -> Tuple[PropertyData, Dict[str, Optional[str]]]:
+    soup, text = parse_document(html, backend or settings.HTML_PARSER)
+    
+    page = engine.page(soup, url, text, normalize)
+    fields = engine.run(page)
+    
+    property_data = PropertyData(
+        id=extract_id_from_url(url),
+        url=url,
+        **fields
+    )
+    
+    # Compute eligibility
+    property_data.compute_eligibility()
+    
+    return property_data, page.raw
+
 def extract_id_from_url(url: str) -> str:
     """Extract property ID from URL"""
     match = re.search(r'/(\d+)/?$', url)
@@ -72,6 +130,11 @@ def extract_id_from_url(url: str) -> str:
         return match.group(1)
     return "unknown"
 
+def listing_key(url: str) -> str:
+    """Storage/cache key: listing ID when the URL has one, otherwise the URL"""
+    listing_id = extract_id_from_url(url)
+    return listing_id if listing_id != "unknown" else url
+
 def extract_property_type(soup: BeautifulSoup, url: str) -> str:
     """Extract property type (villa, condo, etc.)"""
     # Check URL
@@ -100,89 +163,48 @@ def extract_property_type(soup: BeautifulSoup, url: str) -> str:
     
     return 'unknown'
 
+PRICE_SELECTORS = [
+    {'class': 'price'},
+    {'class': 'property-price'},
+    {'class': 'price-sale'},
+]
+
 def extract_price(soup: BeautifulSoup) -> Optional[float]:
     """Extract price in USD"""
-    # Look for price elements
-    price_selectors = [
-        {'class': 'price'},
-        {'class': 'property-price'},
-        {'class': 'price-sale'},
-    ]
-    
-    for selector in price_selectors:
+    # "$575,000", "USD 98,500", "$575K", KHR, ranges (low end)
+    return parse_price(extract_price_text(soup))
+
+def extract_price_text(soup: BeautifulSoup) -> Optional[str]:
+    """Text of the first price element that holds a price"""
+    for selector in PRICE_SELECTORS:
         price_elem = soup.find(attrs=selector)
         if price_elem:
             price_text = price_elem.get_text()
-            # Extract numbers
-            numbers = re.findall(r'[\d,]+', price_text.replace('$', '').replace(',', ''))
-            if numbers:
-                try:
-                    return float(numbers[0])
-                except:
-                    pass
+            if PRICE_PATTERN.search(price_text):
+                return price_text
     
     return None
 
 def extract_bedrooms(soup: BeautifulSoup) -> Optional[int]:
     """Extract number of bedrooms"""
-    # Look for bedroom info
-    text = soup.get_text()
-    match = re.search(r'(\d+)\s*bed', text.lower())
-    if match:
-        return int(match.group(1))
-    return None
+    return _bedrooms_field(engine.page(soup, ""), {})
 
 def extract_bathrooms(soup: BeautifulSoup) -> Optional[int]:
     """Extract number of bathrooms"""
-    text = soup.get_text()
-    match = re.search(r'(\d+)\s*bath', text.lower())
-    if match:
-        return int(match.group(1))
-    return None
+    return _bathrooms_field(engine.page(soup, ""), {})
 
 def extract_sizes(soup: BeautifulSoup) -> Tuple[Optional[float], Optional[float]]:
     """Extract floor area and land size"""
-    size_sqm = None
-    land_size_sqm = None
-    
-    text = soup.get_text()
-    
-    # Look for floor area
-    match = re.search(r'floor area[:\s]+(\d+)\s*m', text.lower())
-    if match:
-        size_sqm = float(match.group(1))
-    
-    # Look for land size
-    match = re.search(r'land size[:\s]+(\d+)\s*m', text.lower())
-    if match:
-        land_size_sqm = float(match.group(1))
-    
-    return size_sqm, land_size_sqm
+    page = engine.page(soup, "")
+    return _size_field(page, {}), _land_size_field(page, {})
 
 def extract_ownership_type(soup: BeautifulSoup) -> Optional[str]:
     """Extract ownership type (hard title, soft title, etc.)"""
-    text = soup.get_text().lower()
-    
-    if 'hard title' in text:
-        return 'hard_title'
-    if 'soft title' in text:
-        return 'soft_title'
-    if 'strata title' in text:
-        return 'strata_title'
-    
-    return None
+    return _ownership_field(engine.page(soup, ""), {})
 
 def extract_floor_level(soup: BeautifulSoup, property_type: str) -> Optional[int]:
     """Extract floor level (for condos)"""
-    if property_type != 'condo':
-        return None
-    
-    text = soup.get_text()
-    match = re.search(r'floor[:\s]+(\d+)', text.lower())
-    if match:
-        return int(match.group(1))
-    
-    return None
+    return _floor_level_field(engine.page(soup, ""), {"type": property_type})
 
 def extract_location(soup: BeautifulSoup) -> Optional[str]:
     """Extract location"""
@@ -231,3 +253,63 @@ def get_fallback_property_data(url: str) -> PropertyData:
         url=url,
         type="unknown",
     )
+
+
+# --- Field extractors (registration order = extraction order) ---
+
+def _int_group(page: ListingPage, name: str) -> Optional[int]:
+    value = page.group(name)
+    return int(value) if value else None
+
+@engine.field("type")
+def _type_field(page: ListingPage, fields: Dict[str, Any]) -> str:
+    return extract_property_type(page.soup, page.url)
+
+@engine.field("price_usd")
+def _price_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[float]:
+    return page.normalized("price_usd", extract_price_text(page.soup), parse_price)
+
+@engine.field("bedrooms", pattern=r'(?P<bedrooms>\d+)\s*bed')
+def _bedrooms_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[int]:
+    return _int_group(page, "bedrooms")
+
+@engine.field("bathrooms", pattern=r'(?P<bathrooms>\d+)\s*bath')
+def _bathrooms_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[int]:
+    return _int_group(page, "bathrooms")
+
+# Number plus unit; parse_area converts sqft and hectares to m²
+AREA = r'[\d,.]+\s*(?:sq\.?\s*ft|sqft|ft²|square\s+f(?:ee|oo)t|sq\.?\s*m|square\s+met(?:er|re)s?|ha\b|hectares?|m)'
+
+@engine.field("size_sqm", pattern=rf'floor area[:\s]+(?P<size_sqm>{AREA})')
+def _size_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[float]:
+    return page.normalized("size_sqm", page.group("size_sqm"), parse_area)
+
+@engine.field("land_size_sqm", pattern=rf'land size[:\s]+(?P<land_size_sqm>{AREA})')
+def _land_size_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[float]:
+    return page.normalized("land_size_sqm", page.group("land_size_sqm"), parse_area)
+
+# Title keywords in priority order, not page order
+OWNERSHIP_KEYWORDS = [
+    ("hard_title", "hard title"),
+    ("soft_title", "soft title"),
+    ("strata_title", "strata title"),
+]
+for _name, _keyword in OWNERSHIP_KEYWORDS:
+    engine.patterns.add(_name, f"(?P<{_name}>{_keyword})")
+
+@engine.field("ownership_type")
+def _ownership_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[str]:
+    for name, _ in OWNERSHIP_KEYWORDS:
+        if page.match(name):
+            return name
+    return None
+
+@engine.field("floor_level", pattern=r'floor[:\s]+(?P<floor_level>\d+)')
+def _floor_level_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[int]:
+    if fields.get("type") != 'condo':
+        return None
+    return _int_group(page, "floor_level")
+
+@engine.field("location")
+def _location_field(page: ListingPage, fields: Dict[str, Any]) -> Optional[str]:
+    return extract_location(page.soup)
@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from models.property import PropertyData
+from services.property_parser import fetch_listing, listing_key
+from config import settings
+
+
+@dataclass
+class StoredProperty:
+    data: PropertyData
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float  # last full download + parse
+    checked_at: float  # last successful fetch or 304 revalidation
+
+
+class PropertyStore:
+    """
+    Parsed listings persisted in SQLite, with the HTTP validators needed to
+    revalidate them cheaply (ETag / Last-Modified).
+
+    Filled by the prefetch worker and by interactive requests; survives
+    restarts and is shared by every worker process. Queries block, so
+    callers on the event loop run them in a thread (see load_property);
+    stats() only reports the row count seen by the last count() or put().
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.refetched = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS properties ("
+                " key TEXT PRIMARY KEY, url TEXT NOT NULL, data TEXT NOT NULL,"
+                " etag TEXT, last_modified TEXT,"
+                " fetched_at REAL NOT NULL, checked_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[StoredProperty]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data, url, etag, last_modified, fetched_at, checked_at"
+                " FROM properties WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, url, etag, last_modified, fetched_at, checked_at = row
+        return StoredProperty(PropertyData.parse_raw(data), url, etag, last_modified, fetched_at, checked_at)
+
+    def put(self, key: str, url: str, data: PropertyData,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO properties VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, data.json(), etag, last_modified, now, now),
+            )
+            self._db().commit()
+        self.count()
+
+    def mark_checked(self, key: str):
+        """Page revalidated as unchanged (304)"""
+        with self._lock:
+            self._db().execute("UPDATE properties SET checked_at = ? WHERE key = ?", (time.time(), key))
+            self._db().commit()
+
+    def count(self) -> int:
+        """Rows in the store (every process's), also kept as `size` for stats()"""
+        with self._lock:
+            self.size = self._db().execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+        return self.size
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "refetched": self.refetched,
+        }
+
+
+# Global property store instance
+property_store = PropertyStore(settings.state_dir / "property_store.sqlite3")
+
+
+async def load_property(url: str, max_age: Optional[float] = None) -> PropertyData:
+    """
+    Listing data from the store, revalidated against the site when older
+    than `max_age` seconds (settings.PROPERTY_STORE_TTL by default).
+
+    Unchanged pages cost a 304 and no parse. Raises on network or parse
+    errors only when there is no stored copy to fall back to.
+    """
+    max_age = settings.PROPERTY_STORE_TTL if max_age is None else max_age
+    key = listing_key(url)
+    # SQLite lookups are quick but still file IO, keep them off the loop
+    stored = await asyncio.to_thread(property_store.get, key)
+
+    if stored is not None and time.time() - stored.checked_at < max_age:
+        property_store.hits += 1
+        return stored.data
+
+    try:
+        if stored is None:
+            property_store.misses += 1
+            result = await fetch_listing(url)
+        else:
+            result = await fetch_listing(url, stored.etag, stored.last_modified)
+    except Exception as e:
+        if stored is None:
+            raise
+        print(f"⚠️  Revalidating {key} failed, serving stored copy: {e}")
+        return stored.data
+
+    if result.not_modified:
+        property_store.revalidated += 1
+        await asyncio.to_thread(property_store.mark_checked, key)
+        return stored.data
+
+    if stored is not None:
+        property_store.refetched += 1
+    await asyncio.to_thread(property_store.put, key, url, result.data, result.etag, result.last_modified)
+    return result.data
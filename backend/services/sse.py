@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional
+
+# Frames whose payload never changes are serialised once
+_ANSWER_PREFIX = b'data: {"type": "answer", "data": '
+_FRAME_SUFFIX = b'}\n\n'
+DONE_FRAME = b'data: {"type": "done"}\n\n'
+
+_END = object()
+
+
+def event_frame(event_type: str, data=None) -> bytes:
+    """A complete SSE frame in the format js/script.js parses"""
+    payload = {"type": event_type} if data is None else {"type": event_type, "data": data}
+    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+def answer_frame(text: str) -> bytes:
+    """Answer frame without building and dumping a dict per delta"""
+    return _ANSWER_PREFIX + json.dumps(text).encode("utf-8") + _FRAME_SUFFIX
+
+
+class StreamStats:
+    """Delta/frame counters and timing for one streamed answer"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_delta_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.deltas = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def record_delta(self):
+        if self.first_delta_at is None:
+            self.first_delta_at = time.perf_counter()
+        self.deltas += 1
+
+    def record_frame(self, frame: bytes):
+        self.frames += 1
+        self.bytes += len(frame)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        if self.first_delta_at is None:
+            return None
+        return (self.first_delta_at - self.started) * 1000
+
+    @property
+    def tokens_per_second(self) -> float:
+        # Each upstream delta is one token for the chat completions stream
+        if self.first_delta_at is None or self.deltas < 2:
+            return 0.0
+        elapsed = (self.finished_at or time.perf_counter()) - self.first_delta_at
+        return (self.deltas - 1) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        ttft = f"{self.ttft_ms:.0f}ms" if self.ttft_ms is not None else "n/a"
+        return (f"{self.deltas} tokens in {self.frames} frames ({self.bytes} bytes), "
+                f"first token {ttft}, {self.tokens_per_second:.1f} tok/s")
+
+
+async def coalesce(deltas: AsyncIterator[str], window_ms: float = 50.0, max_bytes: int = 1024,
+                   queue_size: int = 64, stats: Optional[StreamStats] = None) -> AsyncIterator[str]:
+    """
+    Merge text deltas into larger chunks.
+
+    A chunk is emitted when `window_ms` has passed since its first delta or
+    when it reaches `max_bytes`, whichever comes first; `window_ms=0` passes
+    every delta through. The upstream iterator is drained by a task into a
+    bounded queue, so a client that stops reading eventually stops the
+    upstream read too (backpressure). Closing or cancelling the returned
+    generator - e.g. when the client disconnects - cancels that task and
+    with it the upstream stream.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def pump():
+        try:
+            async for delta in deltas:
+                if stats:
+                    stats.record_delta()
+                await queue.put(delta)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    producer = asyncio.create_task(pump())
+    window = window_ms / 1000
+    parts, size, deadline = [], 0, None
+    try:
+        while True:
+            if parts and window:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    yield "".join(parts)
+                    parts, size, deadline = [], 0, None
+                    continue
+            else:
+                item = await queue.get()
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if not parts:
+                deadline = time.perf_counter() + window
+            parts.append(item)
+            size += len(item.encode("utf-8"))
+            if not window or size >= max_bytes:
+                yield "".join(parts)
+                parts, size, deadline = [], 0, None
+
+        if parts:
+            yield "".join(parts)
+    finally:
+        producer.cancel()
+        if stats:
+            stats.finish()
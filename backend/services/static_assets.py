@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional, assets are then precompressed with gzip only
+    brotli = None
+
+# Hashed URLs never change content
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Plain URLs (and the page itself) are revalidated with the ETag
+REVALIDATE = "no-cache"
+
+# Worth compressing; images and fonts are compressed already
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+
+_ASSET_URL = re.compile(r'(?P<attr>(?:href|src)=")(?P<url>/[^"?#]+)"')
+
+
+def content_type(path: Path) -> str:
+    kind = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if kind == "text/javascript":
+        kind = "application/javascript"
+    # Starlette adds the charset to text/* itself
+    if kind == "application/javascript":
+        kind += "; charset=utf-8"
+    return kind
+
+
+def fingerprinted(url: str, digest: str) -> str:
+    """/css/style.css -> /css/style.<digest>.css"""
+    stem, dot, suffix = url.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot and "/" not in suffix else f"{url}.{digest}"
+
+
+class Asset:
+    """One static file held in memory with its precompressed variants"""
+    __slots__ = ("url", "path", "content_type", "etag", "digest", "body", "gzip", "br", "size")
+
+    def __init__(self, url: str, path: Path, body: Optional[bytes], digest: str, size: int):
+        self.url = url
+        self.path = path
+        self.content_type = content_type(path)
+        self.digest = digest
+        self.etag = f'"{digest}"'
+        self.body = body  # None for files served from disk
+        self.size = size
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+
+    def precompress(self):
+        if self.body is None or len(self.body) < MIN_COMPRESS_BYTES:
+            return
+        if not self.content_type.startswith(COMPRESSIBLE):
+            return
+        compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if len(compressed) < len(self.body):
+            self.gzip = compressed
+        if brotli is not None:
+            compressed = brotli.compress(self.body, quality=11)
+            if len(compressed) < len(self.body):
+                self.br = compressed
+
+
+class StaticAssets:
+    """
+    Static files fingerprinted and compressed once at startup.
+
+    - Every file gets a content-hash ETag; a matching If-None-Match is
+      answered with 304 from memory.
+    - Each file is also served under a hashed name (style.<hash>.css) with
+      an immutable Cache-Control, and HTML pages are rewritten to link to
+      the hashed names, so browsers only revalidate the page itself.
+    - Files up to `max_memory_file` bytes are kept in memory with gzip and
+      brotli variants chosen by Accept-Encoding; larger ones are streamed
+      from disk.
+    """
+
+    def __init__(self, root: Path, directories: Iterable[str], pages: Dict[str, str],
+                 max_memory_file: int = 1_000_000):
+        self.root = Path(root)
+        self.directories = tuple(directories)
+        self.pages = dict(pages)  # URL -> file name, e.g. "/" -> "index.html"
+        self.max_memory_file = max_memory_file
+        self._assets: Dict[str, Asset] = {}
+        self._immutable: Dict[str, Asset] = {}
+        self.hits = 0
+        self.not_modified = 0
+
+    def _add(self, url: str, path: Path, body: Optional[bytes] = None) -> Asset:
+        size = path.stat().st_size
+        if body is None and size <= self.max_memory_file:
+            body = path.read_bytes()
+        digest = hashlib.sha256(body if body is not None else path.read_bytes()).hexdigest()[:16]
+        asset = Asset(url, path, body, digest, size if body is None else len(body))
+        asset.precompress()
+        self._assets[url] = asset
+        return asset
+
+    def load(self):
+        """Fingerprint and precompress everything (FastAPI startup)"""
+        self._assets.clear()
+        self._immutable.clear()
+        for directory in self.directories:
+            base = self.root / directory
+            for path in sorted(base.rglob("*")) if base.is_dir() else []:
+                if path.is_file():
+                    url = "/" + path.relative_to(self.root).as_posix()
+                    asset = self._add(url, path)
+                    self._immutable[fingerprinted(url, asset.digest[:10])] = asset
+
+        # Pages last, linking to the hashed asset names
+        for url, name in self.pages.items():
+            path = self.root / name
+            if path.is_file():
+                html = path.read_text(encoding="utf-8")
+                self._add(url, path, self.rewrite_links(html).encode("utf-8"))
+
+        in_memory = sum(len(a.body) for a in self._assets.values() if a.body is not None)
+        print(f"✅ Loaded {len(self._assets)} static assets ({in_memory / 1024:.0f} KB in memory)")
+
+    def rewrite_links(self, html: str) -> str:
+        def replace(match: re.Match) -> str:
+            asset = self._assets.get(match.group("url"))
+            if asset is None:
+                return match.group(0)
+            return f'{match.group("attr")}{fingerprinted(asset.url, asset.digest[:10])}"'
+        return _ASSET_URL.sub(replace, html)
+
+    def url_for(self, url: str) -> str:
+        """Hashed URL of an asset (the URL itself when unknown)"""
+        asset = self._assets.get(url)
+        return fingerprinted(url, asset.digest[:10]) if asset else url
+
+    def response(self, url: str, if_none_match: Optional[str] = None,
+                 accept_encoding: str = "") -> Response:
+        asset = self._immutable.get(url)
+        cache_control = IMMUTABLE
+        if asset is None:
+            asset = self._assets.get(url)
+            cache_control = REVALIDATE
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not found")
+
+        headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if if_none_match and (if_none_match.strip() == "*" or asset.etag in _etags(if_none_match)):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        self.hits += 1
+        if asset.body is None:
+            return FileResponse(asset.path, media_type=asset.content_type, headers=headers)
+
+        body = asset.body
+        encodings = _encodings(accept_encoding)
+        if asset.br is not None and "br" in encodings:
+            body, headers["Content-Encoding"] = asset.br, "br"
+        elif asset.gzip is not None and "gzip" in encodings:
+            body, headers["Content-Encoding"] = asset.gzip, "gzip"
+        return Response(content=body, media_type=asset.content_type, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "assets": len(self._assets),
+            "memory_bytes": sum(
+                len(a.body or b"") + len(a.gzip or b"") + len(a.br or b"") for a in self._assets.values()
+            ),
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+        }
+
+
+def _etags(header: str) -> set:
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _encodings(header: str) -> set:
+    """Accepted content codings, q=0 excluded"""
+    accepted = set()
+    for part in header.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+# Global asset store for the frontend (loaded on startup)
+static_assets = StaticAssets(
+    Path(__file__).parent.parent.parent,
+    directories=("css", "js", "data"),
+    pages={"/": "index.html"},
+    max_memory_file=settings.STATIC_MEMORY_MAX_FILE,
+)
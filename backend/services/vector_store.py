@@ -1,57 +1,141 @@
 import faiss
 import numpy as np
-import pickle
 from pathlib import Path
-from typing import List, Tuple
-from openai import OpenAI
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import asyncio
 from config import settings
+from services import embeddings, index_store
+from services.index_factory import (
+    create_index,
+    index_metric,
+    min_training_points,
+    prepare_vectors,
+    set_search_params,
+)
+from services.embeddings import embed_text, embed_query, aembed_query, embed_documents
+from services.metrics import span
 
 class VectorStore:
-    """FAISS-based vector store for knowledge base embeddings"""
+    """
+    FAISS-based vector store for knowledge base embeddings
     
-    def __init__(self, dimension: int = 1536):
+    Scores returned by search are L2 distances (lower is closer) for the
+    "l2" metric and cosine similarities (higher is closer) for "cosine".
+    """
+    
+    def __init__(self, dimension: int = 1536, index_type: Optional[str] = None, metric: Optional[str] = None):
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        self.index_type = index_type or settings.INDEX_TYPE
+        self.metric = metric or settings.INDEX_METRIC
+        self.index = self._new_index()
         self.texts = []
         self.metadata = []
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.manifest = None
+        self._source_ids: Dict[str, np.ndarray] = {}
+        self._selectors: Dict[FrozenSet[str], object] = {}
         self.index_path = Path(__file__).parent.parent / "data" / "faiss_index"
         self.index_path.mkdir(parents=True, exist_ok=True)
     
-    def get_embedding(self, text: str) -> np.ndarray:
-        """Get embedding from OpenAI"""
-        response = self.client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
+    def _new_index(self, n_vectors: int = 0, index_type: Optional[str] = None):
+        return create_index(
+            index_type or self.index_type,
+            self.dimension,
+            self.metric,
+            n_vectors=n_vectors,
+            hnsw_m=settings.HNSW_M,
+            ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            nlist=settings.IVF_NLIST,
+            pq_m=settings.IVF_PQ_M,
+            pq_nbits=settings.IVF_PQ_NBITS,
         )
-        return np.array(response.data[0].embedding, dtype=np.float32)
-    
-    def add_texts(self, texts: List[str], metadata: List[dict] = None):
-        """Add texts to the index"""
-        embeddings = []
-        for text in texts:
-            embedding = self.get_embedding(text)
-            embeddings.append(embedding)
-        
-        embeddings_array = np.array(embeddings, dtype=np.float32)
-        self.index.add(embeddings_array)
+    
+    @property
+    def higher_is_better(self) -> bool:
+        """Whether larger search scores mean closer matches"""
+        return self.metric == "cosine"
+    
+    def get_embedding(self, text: str) -> np.ndarray:
+        """Get embedding from OpenAI (cached)"""
+        return embed_text(text)
+    
+    def add_texts(self, texts: List[str], metadata: List[dict] = None, **embed_options):
+        """Add texts to the index (embedded in batches, see embed_documents)"""
+        embeddings_array = asyncio.run(embed_documents(texts, **embed_options))
+        self.add_embeddings(embeddings_array, texts, metadata)
+    
+    def add_embeddings(self, embeddings: np.ndarray, texts: List[str], metadata: List[dict] = None):
+        """Add precomputed embeddings with their texts"""
+        if len(texts):
+            vectors = prepare_vectors(embeddings, self.metric)
+            if self.index.ntotal == 0 and not self.index.is_trained:
+                self._train(vectors)
+            self.index.add(vectors)
+        # A loaded index is read-only and memory-mapped, copy before growing it
+        if not isinstance(self.texts, list):
+            self.texts = list(self.texts)
+            self.metadata = list(self.metadata)
         self.texts.extend(texts)
         
         if metadata:
             self.metadata.extend(metadata)
         else:
             self.metadata.extend([{}] * len(texts))
+        self._index_sources()
+    
+    def _index_sources(self):
+        """Group chunk ids by metadata source for filtered search"""
+        ids: Dict[str, List[int]] = {}
+        for i, item in enumerate(self.metadata):
+            ids.setdefault(item.get("source"), []).append(i)
+        self._source_ids = {source: np.array(v, dtype=np.int64) for source, v in ids.items()}
+        self._selectors = {}
+    
+    @property
+    def sources(self) -> List[str]:
+        """Metadata sources present in the index"""
+        return [source for source in self._source_ids if source is not None]
     
-    def search(self, query: str, k: int = 3) -> List[Tuple[str, dict, float]]:
+    def _train(self, vectors: np.ndarray):
+        """Train an empty index sized for these vectors, or fall back to flat"""
+        self.index = self._new_index(n_vectors=len(vectors))
+        needed = min_training_points(self.index)
+        if len(vectors) < needed:
+            print(f"⚠️  {self.index_type} needs {needed} vectors to train, got {len(vectors)}; using flat index")
+            self.index_type = "flat"
+            self.index = self._new_index(index_type="flat")
+            return
+        self.index.train(vectors)
+    
+    def search(self, query: str, k: int = 3, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, dict, float]]:
         """Search for most similar texts"""
-        query_embedding = self.get_embedding(query)
-        query_embedding = np.array([query_embedding], dtype=np.float32)
+        return self.search_by_vector(embed_query(query), k, sources)
+    
+    async def asearch(self, query: str, k: int = 3, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, dict, float]]:
+        """Search without blocking the event loop on the query embedding"""
+        return self.search_by_vector(await aembed_query(query), k, sources)
+    
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 3,
+                         sources: Optional[Iterable[str]] = None) -> List[Tuple[str, dict, float]]:
+        """
+        Search for the texts nearest to an already computed embedding
         
-        distances, indices = self.index.search(query_embedding, k)
+        `sources` restricts the search to chunks whose metadata source is in
+        the list; other chunks are skipped inside faiss rather than filtered
+        afterwards, so all k results come from the allowed sources.
+        """
+        query_embedding = prepare_vectors(np.array([query_embedding]), self.metric)
+        
+        with span("search"):
+            params = self._search_params(sources)
+            if params is None:
+                distances, indices = self.index.search(query_embedding, k)
+            else:
+                distances, indices = self.index.search(query_embedding, k, params=params)
         
         results = []
         for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.texts):
+            # faiss pads missing results with -1
+            if 0 <= idx < len(self.texts):
                 results.append((
                     self.texts[idx],
                     self.metadata[idx],
@@ -60,41 +144,86 @@ class VectorStore:
         
         return results
     
-    def save(self, name: str = "knowledge_base"):
-        """Save index to disk"""
-        index_file = self.index_path / f"{name}.index"
-        texts_file = self.index_path / f"{name}_texts.pkl"
-        metadata_file = self.index_path / f"{name}_metadata.pkl"
-        
-        faiss.write_index(self.index, str(index_file))
+    def _search_params(self, sources: Optional[Iterable[str]]):
+        """faiss SearchParameters with an ID selector for these sources, or None"""
+        if sources is None:
+            return None
+        wanted = frozenset(sources) & frozenset(self._source_ids)
+        if wanted == frozenset(self._source_ids):
+            return None
         
-        with open(texts_file, 'wb') as f:
-            pickle.dump(self.texts, f)
-        
-        with open(metadata_file, 'wb') as f:
-            pickle.dump(self.metadata, f)
+        params = self._selectors.get(wanted)
+        if params is None:
+            ids = np.concatenate([self._source_ids[s] for s in sorted(wanted)]) if wanted else np.zeros(0, dtype=np.int64)
+            selector = faiss.IDSelectorBatch(ids)
+            # Per-query params replace the index defaults, so carry the tuning over
+            if self.index_type == "ivfpq":
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=settings.IVF_NPROBE)
+            elif self.index_type == "hnsw":
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=settings.HNSW_EF_SEARCH)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+            # Keep the selector alive as long as the params that point to it
+            params.selector_ref = selector
+            self._selectors[wanted] = params
+        return params
+    
+    def save(self, name: str = "knowledge_base", embedding_model: Optional[str] = None,
+             extra: Optional[dict] = None):
+        """Save index to disk (see services/index_store.py for the format)"""
+        index_store.write(
+            self.index_path,
+            name,
+            self.index,
+            list(self.texts),
+            list(self.metadata),
+            embedding_model=embedding_model or embeddings.provider.model,
+            extra={"metric": self.metric, "index_kind": self.index_type, **(extra or {})},
+        )
         
         print(f"✅ Index saved to {self.index_path}")
     
     def load(self, name: str = "knowledge_base") -> bool:
-        """Load index from disk"""
-        index_file = self.index_path / f"{name}.index"
-        texts_file = self.index_path / f"{name}_texts.pkl"
-        metadata_file = self.index_path / f"{name}_metadata.pkl"
-        
-        if not all([index_file.exists(), texts_file.exists(), metadata_file.exists()]):
+        """Load index from disk (memory-mapped)"""
+        try:
+            self.index, self.texts, self.metadata, self.manifest = index_store.read(
+                self.index_path,
+                name,
+                embedding_model=embeddings.provider.model,
+                dimension=self.dimension,
+                verify=settings.INDEX_VERIFY_CHECKSUMS,
+            )
+        except index_store.IndexFormatError as e:
+            if index_store.read_manifest(self.index_path, name) is None and self.has_legacy_index(name):
+                # Pickle files are only read by the migration, never at runtime
+                print(f"⚠️  Index '{name}' is in the legacy pickle format, "
+                      f"run 'python build_index.py --migrate'")
+                return False
+            print(f"⚠️  Cannot load index '{name}': {e}")
             return False
         
-        self.index = faiss.read_index(str(index_file))
-        
-        with open(texts_file, 'rb') as f:
-            self.texts = pickle.load(f)
-        
-        with open(metadata_file, 'rb') as f:
-            self.metadata = pickle.load(f)
-        
+        self._configure_loaded_index()
+        self._index_sources()
         print(f"✅ Index loaded from {self.index_path}")
         return True
+    
+    def _configure_loaded_index(self):
+        """Pick up the metric the index was built with and apply search tuning"""
+        self.metric = index_metric(self.index)
+        if self.manifest:
+            self.index_type = self.manifest.get("index_kind", self.index_type)
+        set_search_params(self.index, nprobe=settings.IVF_NPROBE, ef_search=settings.HNSW_EF_SEARCH)
+    
+    def legacy_files(self, name: str = "knowledge_base") -> Tuple[Path, Path, Path]:
+        """Index, texts and metadata files of the old pickle format"""
+        return (
+            self.index_path / f"{name}.index",
+            self.index_path / f"{name}_texts.pkl",
+            self.index_path / f"{name}_metadata.pkl",
+        )
+    
+    def has_legacy_index(self, name: str = "knowledge_base") -> bool:
+        return all(path.exists() for path in self.legacy_files(name))
 
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]: